@@ -0,0 +1,23 @@
+"""
+Cached wall-clock timestamps for log-like payloads.
+Formats the ISO string at most once per second; use datetime.now() directly where sub-second precision matters.
+"""
+import time
+import threading
+from datetime import datetime
+
+_lock = threading.Lock()
+_cached_second = -1
+_cached_iso = ""
+
+
+def now_iso() -> str:
+    """Local time as an ISO string with one-second resolution."""
+    global _cached_second, _cached_iso
+    second = int(time.time())
+    if second != _cached_second:
+        with _lock:
+            if second != _cached_second:
+                _cached_iso = datetime.fromtimestamp(second).isoformat()
+                _cached_second = second
+    return _cached_iso
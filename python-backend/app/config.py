@@ -36,10 +36,18 @@ ASSIGNMENTS_FILE = os.path.join(_APP_DATA, "campaign_assignments.json")
 LEADS_DIR = os.path.join(_APP_DATA, "leads")
 SENDS_CSV = os.path.join(_APP_DATA, "sends.csv")
 REPLIES_CSV = os.path.join(_APP_DATA, "replies.csv")
+# Per-day reply/inbound counts for replies.csv, kept up to date by the reply monitor
+REPLIES_DAILY_COUNTS_FILE = os.path.join(_APP_DATA, "replies_daily_counts.json")
+SEEN_REPLIES_DIR = os.path.join(_APP_DATA, "seen_replies")
+
+# Print every API request to stdout (disable in production to keep stdout writes off the request path)
+LOG_TO_STDOUT = os.getenv("LOG_TO_STDOUT", "true").lower() == "true"
 
 # Reply monitor settings
 REPLY_MONITOR_ENABLED = os.getenv("REPLY_MONITOR_ENABLED", "true").lower() == "true"
 REPLY_POLL_INTERVAL = int(os.getenv("REPLY_POLL_INTERVAL", "45"))
+# Only poll accounts that sent a DM within this many days (0 = poll every account)
+REPLY_MONITOR_ACTIVE_DAYS = int(os.getenv("REPLY_MONITOR_ACTIVE_DAYS", "30"))
 
 # Grok API Configuration (optional)
 GROK_API_KEY = os.getenv("GROK_API_KEY", "")
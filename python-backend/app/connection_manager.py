@@ -1,8 +1,11 @@
 from fastapi import WebSocket
 from typing import List
+import asyncio
+import dataclasses
 import json
 import os
 from datetime import datetime
+from . import jsonio
 
 # #region agent log
 def _agent_log(location: str, message: str, data: dict, hypothesis_id: str = ""):
@@ -14,6 +17,18 @@ def _agent_log(location: str, message: str, data: dict, hypothesis_id: str = "")
         pass
 # #endregion
 
+def _encode(message) -> str:
+    """Serialize a message (dict or dataclass) for a text frame (orjson when available)."""
+    try:
+        return jsonio.dumps(message).decode("utf-8")
+    except TypeError:
+        # orjson rejects non-str keys and unknown types that stdlib json tolerates;
+        # stdlib json also needs dataclasses converted first
+        if dataclasses.is_dataclass(message):
+            message = dataclasses.asdict(message)
+        return json.dumps(message, default=str)
+
+
 class ConnectionManager:
     """Manages WebSocket connections for real-time updates"""
     
@@ -28,25 +43,34 @@ class ConnectionManager:
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
 
-    async def broadcast(self, message: dict):
-        """Broadcast message to all connected clients"""
+    async def broadcast(self, message):
+        """Broadcast message (dict or dataclass with a type field) to all connected clients"""
         # #region agent log
-        _agent_log("connection_manager.py:broadcast", "entry", {"n_connections": len(self.active_connections), "msg_type": message.get("type")}, "H2")
+        _agent_log("connection_manager.py:broadcast", "entry", {"n_connections": len(self.active_connections), "msg_type": message.get("type") if isinstance(message, dict) else getattr(message, "type", None)}, "H2")
         # #endregion
-        disconnected = []
-        for connection in self.active_connections:
+        connections = list(self.active_connections)
+        if not connections:
+            return
+        # Serialize once and send the same text frame to every client; with several clients the
+        # sends run concurrently so one slow socket does not hold up the rest
+        text = _encode(message)
+        if len(connections) == 1:
+            results = [None]
             try:
-                await connection.send_json(message)
-            except Exception:
-                disconnected.append(connection)
+                await connections[0].send_text(text)
+            except Exception as e:
+                results[0] = e
+        else:
+            results = await asyncio.gather(*(c.send_text(text) for c in connections), return_exceptions=True)
         
         # Remove disconnected connections
-        for conn in disconnected:
-            self.disconnect(conn)
+        for conn, result in zip(connections, results):
+            if isinstance(result, Exception):
+                self.disconnect(conn)
 
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Send message to a specific client"""
         try:
-            await websocket.send_json(message)
+            await websocket.send_text(_encode(message))
         except:
             self.disconnect(websocket)
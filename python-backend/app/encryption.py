@@ -0,0 +1,75 @@
+"""Encryption of stored account secrets (password, proxy, session cookies).
+
+New values are AES-256-GCM, stored as "v2:" + base64(nonce || ciphertext) with the key
+derived from KEY_FILE. Older values are Fernet tokens, bare or wrapped in another layer
+of base64, and still decrypt.
+"""
+import base64
+import binascii
+import os
+import threading
+from typing import Optional
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from .config import KEY_FILE
+
+V2_PREFIX = "v2:"
+# Every Fernet token starts with the base64 of its 0x80 version byte and timestamp high bytes
+FERNET_TOKEN_PREFIX = "gAAAAA"
+NONCE_SIZE = 12
+
+_fernet: Optional[Fernet] = None
+_aesgcm: Optional[AESGCM] = None
+_lock = threading.Lock()
+
+
+def get_or_create_key() -> bytes:
+    """Get or create the Fernet key in KEY_FILE"""
+    if os.path.exists(KEY_FILE):
+        with open(KEY_FILE, "rb") as f:
+            return f.read()
+    key = Fernet.generate_key()
+    with open(KEY_FILE, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _load_ciphers():
+    """Build the Fernet (legacy reads) and AES-GCM ciphers once per process"""
+    global _fernet, _aesgcm
+    if _aesgcm is None:
+        with _lock:
+            if _aesgcm is None:
+                key = get_or_create_key()
+                _fernet = Fernet(key)
+                derived = HKDF(
+                    algorithm=hashes.SHA256(),
+                    length=32,
+                    salt=None,
+                    info=b"gramsender account fields v2",
+                ).derive(base64.urlsafe_b64decode(key))
+                _aesgcm = AESGCM(derived)
+    return _fernet, _aesgcm
+
+
+def encrypt_field(plaintext: str) -> str:
+    """Encrypt a secret for storage (v2 format)"""
+    _, aesgcm = _load_ciphers()
+    nonce = os.urandom(NONCE_SIZE)
+    token = nonce + aesgcm.encrypt(nonce, plaintext.encode(), None)
+    return V2_PREFIX + binascii.b2a_base64(token, newline=False).decode("ascii")
+
+
+def decrypt_field(stored: str) -> str:
+    """Decrypt a stored secret in either format. Raises on a bad key or corrupt value."""
+    fernet, aesgcm = _load_ciphers()
+    if stored.startswith(V2_PREFIX):
+        token = binascii.a2b_base64(stored[len(V2_PREFIX):])
+        return aesgcm.decrypt(token[:NONCE_SIZE], token[NONCE_SIZE:], None).decode()
+    if stored.startswith(FERNET_TOKEN_PREFIX):
+        return fernet.decrypt(stored).decode()
+    return fernet.decrypt(binascii.a2b_base64(stored)).decode()
@@ -4,7 +4,10 @@ import time
 import random
 import threading
 import json
+import uuid
+import requests
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 
 SENT_DMS_FILE = os.path.join(os.path.dirname(__file__), "sent_dms.json")
 _sent_dms_lock = threading.Lock()
@@ -62,9 +65,18 @@ except Exception as e:
 
 # Now import Client after patching
 from instagrapi import Client
-from instagrapi.exceptions import ClientError, LoginRequired, PleaseWaitFewMinutes
-from requests.exceptions import TooManyRedirects
+from instagrapi.exceptions import (
+    ClientConnectionError,
+    ClientError,
+    ClientIncompleteReadError,
+    ClientRequestTimeout,
+    LoginRequired,
+    PleaseWaitFewMinutes,
+)
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout as RequestsTimeout, TooManyRedirects
 
+from . import jsonio
+from .clock import now_iso
 from .config import SESSIONS_DIR, LEADS_DIR, LEAD_LOOKUP_DELAY_MIN, LEAD_LOOKUP_DELAY_MAX, HTTPCLOAK_USE_FOR_DM
 from .instagram_login import InstagramLoginHelper
 from .services.grok_gender_detector import GrokGenderDetector
@@ -148,16 +160,12 @@ def is_first_world_country(country_name: str) -> bool:
             return True
     return False
 
-def bio_contains_keywords(bio_text: str, keywords: list) -> bool:
-    """Check if bio contains any of the specified keywords"""
+def bio_contains_keywords(bio_text: str, keywords: frozenset) -> bool:
+    """Check if bio contains any of the specified keywords (already stripped and lowercased)"""
     if not bio_text or not keywords:
         return True
-    bio_lower = bio_text.lower().strip()
-    for keyword in keywords:
-        keyword_clean = keyword.strip().lower()
-        if keyword_clean and keyword_clean in bio_lower:
-            return True
-    return False
+    bio_lower = bio_text.lower()
+    return any(keyword in bio_lower for keyword in keywords)
 
 def detect_gender_from_name(full_name: str, first_name: str = "") -> str:
     """Attempt to detect gender from name using common patterns"""
@@ -185,12 +193,60 @@ def detect_gender_from_name(full_name: str, first_name: str = "") -> str:
     return "unknown"
 
 
+# DM send retry: transient failures (timeouts, dropped connections, 5XX) are retried with
+# exponential backoff + jitter; 4XX responses (ban, challenge, rate limit) are never retried.
+DM_RETRY_ATTEMPTS = 3
+DM_RETRY_BASE_DELAY = 0.5
+
+
+def _is_transient_error(error) -> bool:
+    """True for errors worth retrying: timeouts, connection drops and 5XX responses."""
+    if isinstance(error, (ClientConnectionError, ClientRequestTimeout, ClientIncompleteReadError,
+                          RequestsConnectionError, RequestsTimeout)):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+def _retry(fn, max_attempts=DM_RETRY_ATTEMPTS, base=DM_RETRY_BASE_DELAY):
+    """Call fn(), retrying transient errors with exponential backoff + jitter. Other errors are raised immediately."""
+    for attempt in range(max_attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt + 1 >= max_attempts or not _is_transient_error(e):
+                raise
+            time.sleep(base * 2 ** attempt + random.random() * 0.3)
+
+
+# Minimum seconds between session settings dumps during a run (always dumped on shutdown/re-auth)
+SESSION_DUMP_INTERVAL = 30
+
+# When X-Ratelimit-Remaining drops below this, wait for the advertised reset before continuing
+RATE_LIMIT_LOW_WATERMARK = 5
+# Upper bound on a rate-limit pause, whatever reset Instagram advertises
+RATE_LIMIT_MAX_WAIT = 900
+
+
+def _parse_rate_limit_reset(value, now: float):
+    """Parse Retry-After / X-Ratelimit-Reset (delta seconds, epoch seconds or HTTP date) into an epoch timestamp."""
+    try:
+        seconds = float(value)
+        return seconds if seconds > 1e9 else now + seconds
+    except (TypeError, ValueError):
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
 def _append_sent_dm(campaign_id, account_username, recipient_username, thread_id, sent_at, initial_message, message_type="initial", follow_up_index=0):
     """Append sent DM record to sent_dms.json for linking replies to campaigns."""
     with _sent_dms_lock:
         try:
-            with open(SENT_DMS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with open(SENT_DMS_FILE, "rb") as f:
+                data = jsonio.loads(f.read())
         except Exception:
             data = []
         data.append({
@@ -203,15 +259,28 @@ def _append_sent_dm(campaign_id, account_username, recipient_username, thread_id
             "message_type": message_type,
             "follow_up_index": follow_up_index
         })
-        with open(SENT_DMS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # Rewritten per DM and read by the reply monitor: compact, and swapped in atomically
+        # so the monitor never sees a half-written file
+        tmp = SENT_DMS_FILE + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(jsonio.dumps(data))
+        os.replace(tmp, SENT_DMS_FILE)
+
+
+_SETTINGS_FILE = os.path.join(os.path.dirname(__file__), "..", "settings.json")
+# Parsed settings.json keyed by its st_mtime_ns; shared, do not mutate
+_settings_cache = (-1, {})
 
 
 def _get_global_settings():
-    """Get global settings from settings.json."""
+    """Get global settings from settings.json (re-read only when the file has changed)."""
+    global _settings_cache
     try:
-        with open(os.path.join(os.path.dirname(__file__), "..", "settings.json"), "r", encoding="utf-8") as f:
-            return json.load(f)
+        mtime_ns = os.stat(_SETTINGS_FILE).st_mtime_ns
+        if mtime_ns != _settings_cache[0]:
+            with open(_SETTINGS_FILE, "rb") as f:
+                _settings_cache = (mtime_ns, jsonio.loads(f.read()))
+        return _settings_cache[1]
     except Exception:
         return {}
 
@@ -229,8 +298,8 @@ def _send_webhook(campaign_id, event, payload):
             campaign = None
     else:
         try:
-            with open(CAMPAIGNS_FILE, "r", encoding="utf-8") as f:
-                campaigns = json.load(f)
+            with open(CAMPAIGNS_FILE, "rb") as f:
+                campaigns = jsonio.loads(f.read())
             campaign = campaigns.get(campaign_id)
         except Exception:
             campaign = None
@@ -248,13 +317,13 @@ def _send_webhook(campaign_id, event, payload):
         full_payload = {
             "event": event,
             "campaign_id": campaign_id,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now_iso(),
             "app_version": "1.0",
             "secret": secret,
             **payload
         }
         try:
-            requests.post(url, json=full_payload, timeout=10)
+            requests.post(url, data=jsonio.dumps(full_payload), headers={"Content-Type": "application/json"}, timeout=10)
         except Exception as e:
             print(f"[Webhook] Failed to send {event} for campaign {campaign_id}: {e}")
 
@@ -291,7 +360,8 @@ class InstagramWorkerThread(threading.Thread):
         self.follow_ups = follow_ups if follow_ups is not None else []
         self.country_filter_enabled = country_filter_enabled
         self.bio_filter_enabled = bio_filter_enabled
-        self.bio_keywords = bio_keywords
+        # Stripped/lowercased once so the per-lead check is a plain substring test
+        self.bio_keywords = frozenset(k for k in (k.strip().lower() for k in (bio_keywords or ())) if k)
         self.gender_filter = gender_filter
         self.grok_detector = GrokGenderDetector()  # Initialize Grok detector
         self.debug_mode = debug_mode
@@ -308,8 +378,6 @@ class InstagramWorkerThread(threading.Thread):
         self.on_message_sent = on_message_sent or (lambda *a, **kw: None)
         if message_templates is None:
             message_templates = []
-        if bio_keywords is None:
-            bio_keywords = []
         
         # Settings
         self.min_delay = min_delay
@@ -339,6 +407,12 @@ class InstagramWorkerThread(threading.Thread):
         self._auth_failure = False
         # When user submits code via 2FA modal (ChallengeResolve/submit_phone), use for next login
         self._verification_code = ""
+        # Rate-limit state from Instagram response headers (X-Ratelimit-Remaining / Retry-After)
+        self._rl_remaining = None
+        self._rl_reset = None
+        # Session settings are dumped to disk at most every SESSION_DUMP_INTERVAL seconds
+        self._settings_dirty = False
+        self._settings_dumped_at = 0.0
         
         self.debug_log("Worker initialized", f"Account: {self.account_name}, Target: {self.target_input}, Mode: {self.target_mode}")
     
@@ -392,6 +466,20 @@ class InstagramWorkerThread(threading.Thread):
         _agent_log("instagram_worker.py:attempt_login_with_retry", "exit", {"result": False, "reason": "helper_failed"}, "H3")
         return False
     
+    def _flush_session_settings(self, force=False):
+        """Dump client settings to the session file if dirty (throttled unless force)."""
+        if not self._settings_dirty or not self.client or not hasattr(self.client, "dump_settings"):
+            return
+        now = time.monotonic()
+        if not force and now - self._settings_dumped_at < SESSION_DUMP_INTERVAL:
+            return
+        try:
+            self.client.dump_settings(os.path.join(SESSIONS_DIR, f"{self.username}.json"))
+            self._settings_dirty = False
+            self._settings_dumped_at = now
+        except Exception as e:
+            self.debug_log("Could not save session settings", str(e))
+
     def _delete_stale_session_file(self):
         """Remove saved session file so next login is fresh (username/password)."""
         os.makedirs(SESSIONS_DIR, exist_ok=True)
@@ -427,6 +515,8 @@ class InstagramWorkerThread(threading.Thread):
             try:
                 self.client.relogin()
                 self.debug_log("Re-authenticated", "via relogin()")
+                self._settings_dirty = True
+                self._flush_session_settings(force=True)
                 return True
             except Exception:
                 pass
@@ -467,6 +557,8 @@ class InstagramWorkerThread(threading.Thread):
                             self.client.relogin()
                             re_logged_in = True
                             self.debug_log("Re-authenticated", "via relogin()")
+                            self._settings_dirty = True
+                            self._flush_session_settings(force=True)
                         except Exception:
                             pass
                     if not re_logged_in:
@@ -493,6 +585,138 @@ class InstagramWorkerThread(threading.Thread):
             raise last_exception
         raise Exception(f"Unexpected error in retry_on_login_required for {operation_name}")
     
+    def _record_rate_limit(self, response=None):
+        """Store X-Ratelimit-Remaining and the reset time (Retry-After / X-Ratelimit-Reset) from the last response."""
+        if response is None:
+            response = getattr(self.client, "last_response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return
+        now = time.time()
+        remaining = headers.get("X-Ratelimit-Remaining")
+        if remaining is not None:
+            try:
+                self._rl_remaining = int(remaining)
+            except ValueError:
+                pass
+        reset = headers.get("Retry-After") or headers.get("X-Ratelimit-Reset")
+        if reset:
+            reset_at = _parse_rate_limit_reset(reset, now)
+            if reset_at:
+                self._rl_reset = reset_at
+
+    def _rate_limit_wait(self, default):
+        """Seconds until the advertised rate-limit reset (at most RATE_LIMIT_MAX_WAIT), or default when Instagram gave none."""
+        if self._rl_reset:
+            wait = self._rl_reset - time.time()
+            if wait > 0:
+                return min(wait, RATE_LIMIT_MAX_WAIT)
+        return default
+
+    def _sleep_while_running(self, seconds):
+        """Sleep up to seconds in one-second steps, returning early once the worker is stopped."""
+        deadline = time.time() + seconds
+        while self.running:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, 1.0))
+
+    def _send_dm(self, message, user_id, username):
+        """
+        Send one DM, trying each send method in turn.
+        A single client_context is generated per logical message and shared by the raw
+        API methods, so only those are wrapped in _retry. direct_send/direct_send_text
+        make a fresh client_context per call and are tried once: retrying them after a
+        timeout could deliver the DM twice.
+        
+        Returns:
+            The thread id if the method reports one, else None
+        
+        Raises:
+            LoginRequired if re-login failed, otherwise the last send error
+        """
+        # Bind the uuid generator once; the client may not provide one
+        gen_uuid = getattr(self.client, "generate_uuid", None) or (lambda: str(uuid.uuid4()))
+        client_context = gen_uuid()
+        recipient_users = jsonio.dumps([[int(user_id)]]).decode()
+
+        def send_direct():
+            result = self.retry_on_login_required(
+                self.client.direct_send,
+                message,
+                user_ids=[user_id],
+                operation_name=f"send DM to @{username}",
+                max_retries=2
+            )
+            return getattr(result, "thread_id", None) or getattr(result, "id", None)
+
+        def send_text():
+            self.retry_on_login_required(
+                (lambda: self.client.direct_send_text(message, user_ids=[user_id])),
+                operation_name=f"send DM (text) to @{username}",
+                max_retries=2
+            )
+            return None
+
+        def send_manual_api():
+            data = {
+                "recipient_users": recipient_users,
+                "client_context": client_context,
+                "message": message,
+                "action": "send_item",
+            }
+            self.client.private_request("direct_v1/threads/broadcast/text/", data=data)
+            return None
+
+        def send_via_thread():
+            thread_data = {
+                "recipient_users": recipient_users,
+                "client_context": gen_uuid(),
+            }
+            thread_resp = self.client.private_request("direct_v1/threads/", data=thread_data)
+            if not (thread_resp and thread_resp.get("thread_id")):
+                raise ClientError("Could not create DM thread")
+            msg_data = {
+                "text": message,
+                "client_context": client_context,
+                "action": "send_item",
+            }
+            self.client.private_request(f"direct_v1/threads/{thread_resp['thread_id']}/items/", data=msg_data)
+            return thread_resp["thread_id"]
+
+        # (name, send, retryable): only methods using the shared client_context are retried
+        methods = [("direct_send", send_direct, False)]
+        if hasattr(self.client, "direct_send_text"):
+            methods.append(("direct_send_text", send_text, False))
+        methods.append(("manual_api", send_manual_api, True))
+        methods.append(("thread_first", send_via_thread, True))
+
+        rate_limit_detected = False
+        last_dm_error = None
+        for method_name, send, retryable in methods:
+            try:
+                thread_id = _retry(send) if retryable else send()
+                self._record_rate_limit()
+                self.on_update(f"[{self.account_name}] ✅ SUCCESS! DM sent to @{username} (via {method_name})")
+                return thread_id
+            except LoginRequired:
+                raise
+            except Exception as e:
+                last_dm_error = e
+                self._record_rate_limit(getattr(e, "response", None))
+                self.debug_log(f"DM method {method_name} failed", str(e))
+                if self._is_rate_limit_error(e):
+                    rate_limit_detected = True
+        if rate_limit_detected:
+            self.on_error(
+                f"[{self.account_name}] RATE LIMIT / RESTRICTION: All DM methods failed. "
+                "Try increasing delays, wait 24-48h, or check account/recipient settings."
+            )
+        err = last_dm_error or Exception("DM send failed")
+        self.on_update(f"[{self.account_name}] ❌ FAILED to send DM to @{username}: {err}")
+        raise err
+
     def simulate_human_behavior(self, action_type="general"):
         """Simulate human-like behavior patterns"""
         if not self.human_behavior_enabled:
@@ -557,6 +781,14 @@ class InstagramWorkerThread(threading.Thread):
     
     def add_random_human_delays(self):
         """Add random human-like delays throughout the process"""
+        # Instagram says the quota is nearly spent: wait for the reset instead of guessing
+        if self._rl_remaining is not None and self._rl_remaining < RATE_LIMIT_LOW_WATERMARK:
+            wait = self._rate_limit_wait(0)
+            self._rl_remaining = None
+            if wait > 0:
+                self.debug_log("Rate limit pause", f"Remaining quota low, waiting {wait:.1f}s for reset")
+                self._sleep_while_running(wait)
+        
         if not self.human_behavior_enabled:
             return
         
@@ -1085,6 +1317,7 @@ class InstagramWorkerThread(threading.Thread):
                             ad.wait_for_request("dm")
                         # Try httpcloak first if enabled (browser-identical TLS fingerprinting)
                         httpcloak_ok = False
+                        thread_id = None
                         if HTTPCLOAK_USE_FOR_DM and getattr(self.client, "_httpcloak_client", None):
                             try:
                                 if self.client._httpcloak_client.send_dm(message, [str(user_id)], self.client):
@@ -1093,109 +1326,16 @@ class InstagramWorkerThread(threading.Thread):
                             except Exception as hc_err:
                                 self.debug_log("HttpCloak DM failed, falling back to direct_send", str(hc_err))
                         if not httpcloak_ok:
-                            dm_sent = False
-                            methods_tried = []
-                            rate_limit_detected = False
-                            last_dm_error = None
-                            # Method 1: direct_send (with retry on LoginRequired)
-                            try:
-                                methods_tried.append("direct_send")
-                                result = self.retry_on_login_required(
-                                    self.client.direct_send,
-                                    message,
-                                    user_ids=[user_id],
-                                    operation_name=f"send DM to @{username}",
-                                    max_retries=2
-                                )
-                                dm_sent = True
-                                self.on_update(f"[{self.account_name}] ✅ SUCCESS! DM sent to @{username} (Result: {result})")
-                                # Track sent DM for reply linking
-                                thread_id = getattr(result, "thread_id", None) or getattr(result, "id", None)
-                                if thread_id:
-                                    _append_sent_dm(self.campaign_id, self.username, username, thread_id, datetime.now().isoformat(), message, "initial", 0)
-                            except LoginRequired:
-                                raise
-                            except Exception as e:
-                                last_dm_error = e
-                                if self._is_rate_limit_error(e):
-                                    rate_limit_detected = True
-                            # Method 2: direct_send_text (if available)
-                            if not dm_sent and hasattr(self.client, "direct_send_text"):
-                                try:
-                                    methods_tried.append("direct_send_text")
-                                    self.retry_on_login_required(
-                                        (lambda: self.client.direct_send_text(message, user_ids=[user_id])),
-                                        operation_name=f"send DM (text) to @{username}",
-                                        max_retries=2
-                                    )
-                                    dm_sent = True
-                                    self.on_update(f"[{self.account_name}] ✅ SUCCESS! DM sent to @{username} (via direct_send_text)")
-                                except Exception as e:
-                                    last_dm_error = e
-                                    if self._is_rate_limit_error(e):
-                                        rate_limit_detected = True
-                            # Method 3: manual direct_v1 API
-                            if not dm_sent:
-                                try:
-                                    methods_tried.append("manual_api")
-                                    data = {
-                                        "recipient_users": json.dumps([[int(user_id)]]),
-                                        "client_context": getattr(self.client, "generate_uuid", lambda: str(__import__("uuid").uuid4()))(),
-                                        "message": message,
-                                        "action": "send_item",
-                                    }
-                                    self.client.private_request("direct_v1/threads/broadcast/text/", data=data)
-                                    dm_sent = True
-                                    self.on_update(f"[{self.account_name}] ✅ SUCCESS! DM sent to @{username} (via manual API)")
-                                except Exception as e:
-                                    last_dm_error = e
-                                    if self._is_rate_limit_error(e):
-                                        rate_limit_detected = True
-                            # Method 4: thread first then items
-                            if not dm_sent:
-                                try:
-                                    methods_tried.append("thread_first")
-                                    thread_data = {
-                                        "recipient_users": json.dumps([[int(user_id)]]),
-                                        "client_context": getattr(self.client, "generate_uuid", lambda: str(__import__("uuid").uuid4()))(),
-                                    }
-                                    thread_resp = self.client.private_request("direct_v1/threads/", data=thread_data)
-                                    if thread_resp and thread_resp.get("thread_id"):
-                                        msg_data = {
-                                            "text": message,
-                                            "client_context": getattr(self.client, "generate_uuid", lambda: str(__import__("uuid").uuid4()))(),
-                                            "action": "send_item",
-                                        }
-                                        self.client.private_request(
-                                            f"direct_v1/threads/{thread_resp['thread_id']}/items/",
-                                            data=msg_data
-                                        )
-                                        dm_sent = True
-                                        self.on_update(f"[{self.account_name}] ✅ SUCCESS! DM sent to @{username} (via thread)")
-                                except Exception as e:
-                                    last_dm_error = e
-                                    if self._is_rate_limit_error(e):
-                                        rate_limit_detected = True
-                            if not dm_sent:
-                                if rate_limit_detected:
-                                    self.on_error(
-                                        f"[{self.account_name}] RATE LIMIT / RESTRICTION: All DM methods failed. "
-                                        "Try increasing delays, wait 24-48h, or check account/recipient settings."
-                                    )
-                                err = last_dm_error or Exception("DM send failed")
-                                self.on_update(f"[{self.account_name}] ❌ FAILED to send DM to @{username}: {err}")
-                                raise err
+                            thread_id = self._send_dm(message, user_id, username)
+                        # Track every sent DM (thread_id may be unknown) for reply linking and polling
+                        _append_sent_dm(self.campaign_id, self.username, username, thread_id, datetime.now().isoformat(), message, "initial", 0)
                         
                         successful_messages += 1
                         self.debug_stats['messages_sent'] += 1
                         self.on_message_sent(username, user_id, message)
-                        # Persist session after successful DM (like simple login + dm)
-                        try:
-                            sp = os.path.join(SESSIONS_DIR, f"{self.username}.json")
-                            if hasattr(self.client, "dump_settings") and sp:
-                                self.client.dump_settings(sp)
-                        except Exception:
-                            pass
+                        # Persist session after successful DM (like simple login + dm), batched
+                        self._settings_dirty = True
+                        self._flush_session_settings()
                         self.on_update(f"[{self.account_name}] ✅ Message #{successful_messages} sent successfully to @{username}")
                         # Send webhook for message sent
                         if self.campaign_id:
@@ -1224,16 +1364,11 @@ class InstagramWorkerThread(threading.Thread):
                                     successful_messages += 1
                                     self.debug_stats['messages_sent'] += 1
                                     self.on_message_sent(username, user_id, fu_message)
-                                    try:
-                                        sp = os.path.join(SESSIONS_DIR, f"{self.username}.json")
-                                        if hasattr(self.client, "dump_settings") and sp:
-                                            self.client.dump_settings(sp)
-                                    except Exception:
-                                        pass
+                                    self._settings_dirty = True
+                                    self._flush_session_settings()
                                     self.on_update(f"[{self.account_name}] ✅ Follow-up {i+1} sent to @{username}")
                                     # Track follow-up DM
-                                    if thread_id:
-                                        _append_sent_dm(self.campaign_id, self.username, username, thread_id, datetime.now().isoformat(), fu_message, "follow_up", i+1)
+                                    _append_sent_dm(self.campaign_id, self.username, username, thread_id, datetime.now().isoformat(), fu_message, "follow_up", i+1)
                                     # Send webhook for follow-up message sent
                                     if self.campaign_id:
                                         _send_webhook(self.campaign_id, "message_sent", {"account_username": self.username, "recipient_username": username, "message_type": "follow_up", "cumulative_sent": successful_messages})
@@ -1252,14 +1387,16 @@ class InstagramWorkerThread(threading.Thread):
                         self.on_update(f"[{self.account_name}] ⚠️ Login required for {username} after all retries: {str(e)}")
                         self.debug_stats['errors'] += 1
                         break
+                    except PleaseWaitFewMinutes as e:
+                        self._record_rate_limit(getattr(e, "response", None))
+                        wait = self._rate_limit_wait(300)
+                        self.on_update(f"[{self.account_name}] ⚠️ Rate limited! Waiting {wait / 60:.1f} minutes...")
+                        self._sleep_while_running(wait)
+                        break
                     except ClientError as e:
                         self.on_update(f"[{self.account_name}] ⚠️ Error with {username}: {str(e)}")
                         self.debug_stats['errors'] += 1
                         break
-                    except PleaseWaitFewMinutes:
-                        self.on_update(f"[{self.account_name}] ⚠️ Rate limited! Waiting 5 minutes...")
-                        time.sleep(300)
-                        break
                     except Exception as e:
                         error_msg = str(e)
                         self.on_update(f"[{self.account_name}] ⚠️ Unexpected error with {username}: {error_msg}")
@@ -1290,3 +1427,6 @@ class InstagramWorkerThread(threading.Thread):
         except Exception as e:
             self.on_error(f"[{self.account_name}] Critical error: {str(e)}")
             self.on_complete(success=False)
+        finally:
+            # Always persist the latest cookies/device state on shutdown
+            self._flush_session_settings(force=True)
@@ -1,14 +1,17 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from typing import List, Dict, Optional
-import json
 import asyncio
 import threading
 from datetime import datetime
 import uuid
 import os
+import sys
+import queue
+import logging
+import logging.handlers
 
 # Load environment variables from .env file if it exists
 try:
@@ -28,8 +31,37 @@ except Exception:
 
 from .routes import campaigns, accounts, workers, assignments, replies, settings
 from .connection_manager import ConnectionManager
+from .config import LOG_TO_STDOUT, STORAGE_MODE, ACCOUNTS_FILE
+from .worker_manager import WorkerManager
+from .clock import now_iso
+from . import jsonio
 
-app = FastAPI(title="Instagram Outreach API", version="1.0.0")
+# Pre-serialized reply to WebSocket pings
+PONG_TEXT = jsonio.dumps({"type": "pong"}).decode("utf-8")
+
+# Max queued api_log messages before new ones are dropped
+API_LOG_QUEUE_SIZE = 1000
+# Seconds between writes of changed JSON-mode accounts/assignments and pending worker sends/counts
+JSON_FLUSH_INTERVAL = 1.0
+# Max worker events broadcast per drainer wakeup
+WORKER_EVENT_BATCH = 256
+
+# Request logging: the middleware only enqueues records; a QueueListener thread writes them to stdout
+api_logger = logging.getLogger("gramsender.api")
+api_logger.setLevel(logging.INFO if LOG_TO_STDOUT else logging.WARNING)
+api_logger.propagate = False
+_api_log_records: queue.Queue = queue.Queue(-1)
+api_logger.addHandler(logging.handlers.QueueHandler(_api_log_records))
+_api_stdout_handler = logging.StreamHandler(sys.stdout)
+_api_stdout_handler.setFormatter(logging.Formatter("[API] %(message)s"))
+api_log_listener = logging.handlers.QueueListener(_api_log_records, _api_stdout_handler)
+
+# Routers without their own default_response_class inherit this one
+app = FastAPI(
+    title="Instagram Outreach API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse if jsonio.ORJSON_AVAILABLE else JSONResponse,
+)
 
 
 class RequestLogMiddleware(BaseHTTPMiddleware):
@@ -38,36 +70,88 @@ class RequestLogMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request, call_next):
         method = request.method
         path = request.url.path
-        print(f"[API] {method} {path}", flush=True)
+        api_logger.info("%s %s", method, path)
         response = await call_next(request)
         status = response.status_code
-        print(f"[API] {method} {path} -> {status}", flush=True)
-        # Broadcast to WebSocket clients for Logs page (skip /ws to avoid noise)
+        api_logger.info("%s %s -> %s", method, path, status)
+        # Queue for WebSocket clients (Logs page); drained by _drain_api_logs so the
+        # response is not held up by the broadcast. Skip /ws to avoid noise.
         if not path.startswith("/ws"):
-            mgr = getattr(request.app.state, "connection_manager", None)
-            if mgr:
+            log_queue = getattr(request.app.state, "log_queue", None)
+            if log_queue is not None:
                 try:
-                    await mgr.broadcast({
+                    log_queue.put_nowait({
                         "type": "api_log",
                         "method": method,
                         "path": path,
                         "status_code": status,
-                        "timestamp": datetime.now().isoformat(),
+                        "timestamp": now_iso(),
                     })
-                except Exception:
+                except asyncio.QueueFull:
                     pass
         return response
 
 
+async def _drain_api_logs(log_queue: asyncio.Queue, mgr: ConnectionManager):
+    """Broadcast queued api_log messages to WebSocket clients (runs for the app lifetime)."""
+    while True:
+        msg = await log_queue.get()
+        try:
+            await mgr.broadcast(msg)
+        except Exception:
+            pass
+
+
+async def _drain_worker_events(event_queue: asyncio.Queue, mgr: ConnectionManager):
+    """Broadcast events queued by worker and reply monitor threads (runs for the app lifetime). Each wakeup takes
+    everything queued so far, up to WORKER_EVENT_BATCH, and keeps only the newest progress event per worker."""
+    while True:
+        batch = [await event_queue.get()]
+        while len(batch) < WORKER_EVENT_BATCH and not event_queue.empty():
+            batch.append(event_queue.get_nowait())
+        latest_progress = {}
+        for i, msg in enumerate(batch):
+            if isinstance(msg, dict) and msg.get("type") == "progress":
+                latest_progress[msg.get("worker_id")] = i
+        for i, msg in enumerate(batch):
+            if isinstance(msg, dict) and msg.get("type") == "progress" and latest_progress[msg.get("worker_id")] != i:
+                continue  # superseded by a later progress event in this batch
+            try:
+                await mgr.broadcast(msg)
+            except Exception:
+                pass
+
+
+# Periodic writers for state batched in memory: JSON-mode accounts/assignments, and the
+# sends.csv rows and campaign messages_sent counts / status changes from the workers
+_PERIODIC_FLUSHES = (
+    accounts.flush_accounts,
+    assignments.flush_assignments,
+    workers.flush_sends_csv,
+    workers.flush_campaign_updates,
+)
+
+
+async def _flush_json_stores():
+    """Write changed in-memory accounts/assignments and pending worker sends/counts (runs for the app lifetime)."""
+    while True:
+        await asyncio.sleep(JSON_FLUSH_INTERVAL)
+        for flush in _PERIODIC_FLUSHES:
+            try:
+                await flush()
+            except Exception as e:
+                print(f"[API] JSON flush error: {e}")
+
+
 app.add_middleware(RequestLogMiddleware)
 
 # CORS middleware for React frontend
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:3001", "http://localhost:5173"],
+    allow_origin_regex=r"^http://localhost:(3000|3001|5173)$",
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["authorization", "content-type", "x-api-key"],
 )
 
 # Initialize connection manager for WebSocket
@@ -103,19 +187,21 @@ def _parse_optional_datetime(s):
 def _count_sends_in_range(start_dt, end_dt):
     """Count rows in sends.csv where timestamp is in [start_dt, end_dt] (inclusive)."""
     from .config import SENDS_CSV
-    if not os.path.isfile(SENDS_CSV):
+    if not os.path.isfile(SENDS_CSV) or os.path.getsize(SENDS_CSV) == 0:
         return 0
+    # timestamp is the first column, so the first 10 bytes of a row are its ISO date;
+    # rows outside the date window are rejected by a bytes compare without parsing
+    start_day = start_dt.date().isoformat().encode()
+    end_day = end_dt.date().isoformat().encode()
     count = 0
     try:
-        import csv
-        from .routes.workers import SENDS_CSV_HEADER
-        with open(SENDS_CSV, "r", encoding="utf-8", newline="") as f:
-            reader = csv.DictReader(f, fieldnames=SENDS_CSV_HEADER)
-            next(reader, None)  # skip header
-            for row in reader:
-                ts = row.get("timestamp") or ""
-                if not ts or ts == "timestamp":
+        import mmap
+        with open(SENDS_CSV, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            mm.readline()  # skip header
+            for line in iter(mm.readline, b""):
+                if not start_day <= line[:10] <= end_day:
                     continue
+                ts = line.split(b",", 1)[0].decode("utf-8", "ignore")
                 try:
                     dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
                     if start_dt <= dt <= end_dt:
@@ -127,46 +213,57 @@ def _count_sends_in_range(start_dt, end_dt):
     return count
 
 
+def _count_total_sends():
+    """Count all data rows in sends.csv."""
+    from .config import SENDS_CSV
+    if not os.path.isfile(SENDS_CSV):
+        return 0
+    try:
+        with open(SENDS_CSV, "r", encoding="utf-8") as f:
+            total = sum(1 for _ in f) - 1  # subtract header row
+    except Exception:
+        return 0
+    return max(total, 0)
+
+
 @app.get("/api/stats")
 async def get_stats(start: Optional[str] = None, end: Optional[str] = None):
     """Get dashboard statistics. Optional start/end (ISO date or datetime) filter time-based stats to that range."""
     try:
-        from .config import CAMPAIGNS_FILE, ACCOUNTS_FILE, STORAGE_MODE, SENDS_CSV, REPLIES_CSV
-        
         if STORAGE_MODE == "supabase":
             try:
-                from .services.database import DatabaseService
-                db_service = DatabaseService.get_instance()
-                campaigns_data = db_service.get_campaigns()
-                accounts_data = db_service.get_accounts()
+                db_service = app.state.db_service
+                if db_service is None:
+                    from .services.database import DatabaseService
+                    db_service = app.state.db_service = DatabaseService.get_instance()
+                # Two independent round trips: run them concurrently in worker threads
+                campaigns_data, accounts_data = await asyncio.gather(
+                    asyncio.to_thread(db_service.get_campaigns),
+                    asyncio.to_thread(db_service.get_accounts),
+                )
             except Exception as e:
                 print(f"Error loading from Supabase: {e}")
                 campaigns_data = {}
                 accounts_data = {}
         else:
-            # Load campaigns
-            try:
-                with open(CAMPAIGNS_FILE, "r", encoding='utf-8') as f:
-                    campaigns_data = json.load(f)
-            except:
-                campaigns_data = {}
+            # Load campaigns (mtime-cached by the campaigns routes)
+            campaigns_data = campaigns.load_campaigns()
             
             # Load accounts
             try:
-                with open(ACCOUNTS_FILE, "r", encoding='utf-8') as f:
-                    accounts_data = json.load(f)
+                with open(ACCOUNTS_FILE, "rb") as f:
+                    accounts_data = jsonio.loads(f.read())
             except:
                 accounts_data = {}
         
+        # Get worker stats; running campaigns are counted incrementally by WorkerManager
+        worker_manager = app.state.worker_manager
+        active_workers = len(worker_manager.active_workers)
+        
         # Calculate stats
-        active_campaigns = len([c for c in campaigns_data.values() if c.get("status") == "running"])
+        active_campaigns = worker_manager.active_campaign_count
         total_campaigns = len(campaigns_data)
         total_accounts = len(accounts_data)
-        
-        # Get worker stats
-        from .worker_manager import WorkerManager
-        worker_manager = WorkerManager.get_instance()
-        active_workers = len(worker_manager.active_workers)
         # Time range filter: when both start and end provided, filter messages/replies/inbounds to [start, end]
         use_range = start is not None and end is not None
         start_dt = _parse_optional_datetime(start) if use_range else None
@@ -174,21 +271,17 @@ async def get_stats(start: Optional[str] = None, end: Optional[str] = None):
         if use_range and (start_dt is None or end_dt is None):
             use_range = False
 
-        # Total messages = rows in sends.csv (all-time, or in range when filter active)
-        total_messages = 0
+        # Total messages = rows in sends.csv (all-time, or in range when filter active);
+        # replies vs inbounds: today (default) or in [start, end] when filter active.
+        # Both are blocking file scans, so run them in worker threads off the event loop.
         if use_range:
-            total_messages = _count_sends_in_range(start_dt, end_dt)
-        elif os.path.isfile(SENDS_CSV):
-            try:
-                with open(SENDS_CSV, "r", encoding="utf-8") as f:
-                    total_messages = sum(1 for _ in f) - 1  # subtract header row
-                if total_messages < 0:
-                    total_messages = 0
-            except Exception:
-                total_messages = 0
-
-        # Replies vs inbounds: today (default) or in [start, end] when filter active
-        total_replies, total_inbounds = replies.count_replies_and_inbounds_in_range(start, end)
+            count_sends = asyncio.to_thread(_count_sends_in_range, start_dt, end_dt)
+        else:
+            count_sends = asyncio.to_thread(_count_total_sends)
+        total_messages, (total_replies, total_inbounds) = await asyncio.gather(
+            count_sends,
+            asyncio.to_thread(replies.count_replies_and_inbounds_in_range, start, end),
+        )
         
         return {
             "totalMessages": total_messages,
@@ -221,10 +314,10 @@ async def websocket_endpoint(websocket: WebSocket):
             # Keep connection alive and handle incoming messages
             data = await websocket.receive_text()
             try:
-                message = json.loads(data)
+                message = jsonio.loads(data)
                 # Handle different message types if needed
                 if message.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    await websocket.send_text(PONG_TEXT)
             except:
                 pass
     except WebSocketDisconnect:
@@ -232,23 +325,62 @@ async def websocket_endpoint(websocket: WebSocket):
 
 # Make connection_manager available to other modules
 app.state.connection_manager = connection_manager
+# Shared singletons for request handlers (db_service is filled in on startup)
+app.state.worker_manager = WorkerManager.get_instance()
+app.state.db_service = None
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Start reply monitor in background thread if enabled."""
+    """Start the api_log and worker event broadcasters, preload the database client, and start the reply monitor in a background thread if enabled."""
     from .config import REPLY_MONITOR_ENABLED
+    api_log_listener.start()
+    app.state.log_queue = asyncio.Queue(maxsize=API_LOG_QUEUE_SIZE)
+    app.state.log_drainer = asyncio.create_task(_drain_api_logs(app.state.log_queue, app.state.connection_manager))
+    app.state.json_flusher = asyncio.create_task(_flush_json_stores())
+    # Worker threads hand events over with loop.call_soon_threadsafe(queue.put_nowait, msg);
+    # unbounded so complete/need_2fa events are never dropped
+    app.state.worker_event_queue = asyncio.Queue()
+    app.state.worker_event_drainer = asyncio.create_task(
+        _drain_worker_events(app.state.worker_event_queue, app.state.connection_manager)
+    )
+    if STORAGE_MODE == "supabase":
+        # Pay the supabase import / client setup here rather than on the first request
+        try:
+            from .services.database import DatabaseService
+            app.state.db_service = DatabaseService.get_instance()
+        except Exception as e:
+            print(f"Error initializing Supabase client: {e}")
     if REPLY_MONITOR_ENABLED:
         from .reply_monitor import run_reply_monitor_loop
         loop = asyncio.get_running_loop()
-        cm = app.state.connection_manager
-        def broadcast_sync(msg: dict):
-            asyncio.run_coroutine_threadsafe(cm.broadcast(msg), loop)
+        event_queue = app.state.worker_event_queue
+        def broadcast_sync(msg):
+            # Fire-and-forget: one callback on the loop, no coroutine or Future per event
+            loop.call_soon_threadsafe(event_queue.put_nowait, msg)
         thread = threading.Thread(target=run_reply_monitor_loop, args=(broadcast_sync,), daemon=True)
         thread.start()
         print("[ReplyMonitor] Background reply monitor started (REPLY_MONITOR_ENABLED=true).")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write out pending JSON-mode changes and flush pending request log records."""
+    app.state.json_flusher.cancel()
+    for flush in _PERIODIC_FLUSHES:
+        try:
+            await flush()
+        except Exception as e:
+            print(f"[API] JSON flush error: {e}")
+    api_log_listener.stop()
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8012)
+    try:
+        import uvloop
+        uvloop.install()
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"  # uvloop is not available on Windows
+    uvicorn.run(app, host="0.0.0.0", port=8012, loop=loop)
@@ -3,20 +3,36 @@ Reply detection + tracking: poll DMs for unread replies, append to replies.csv,
 Uses same session/login as workers (InstagramLoginHelper). Run in background thread when REPLY_MONITOR_ENABLED.
 """
 import csv
-import json
 import os
+import queue
+import random
 import threading
 import time
 import requests
-from datetime import datetime
-from typing import Callable, Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+from . import jsonio
+from .encryption import decrypt_field
 from .config import (
     ACCOUNTS_FILE,
     CAMPAIGNS_FILE,
     KEY_FILE,
     REPLIES_CSV,
+    REPLIES_DAILY_COUNTS_FILE,
+    REPLY_MONITOR_ACTIVE_DAYS,
     REPLY_POLL_INTERVAL,
+    SEEN_REPLIES_DIR,
     SESSIONS_DIR,
     STORAGE_MODE,
 )
@@ -36,9 +52,56 @@ REPLIES_CSV_HEADER = (
     "message_type",  # "reply" = replied to a message; "inbound" = new message from lead (not a reply)
 )
 
+@dataclass
+class ReplyEvent:
+    """new_reply WebSocket message; orjson serializes dataclasses natively, skipping the dict build."""
+    account_username: str
+    account_name: str
+    thread_title: str
+    replier_username: str
+    reply_text: str
+    message_type: str
+    timestamp: str
+    type: str = "new_reply"
+
+
 _replies_csv_lock = threading.Lock()
+_pending_reply_rows: List[tuple] = []  # replies.csv rows waiting for _flush_replies_csv
+_replies_header_written = False  # set once replies.csv is known to exist with its header
+# {"csv_size": bytes of replies.csv counted, "days": {YYYY-MM-DD: {"reply": n, "inbound": m}}}; guarded by _replies_csv_lock
+_daily_counts: Optional[Dict[str, Any]] = None
 _sent_dms_lock = threading.Lock()
 SENT_DMS_FILE = os.path.join(os.path.dirname(__file__), "sent_dms.json")
+# recipient_username -> (latest sent_at, campaign_id), rebuilt with _sent_dms_last_send when sent_dms.json's mtime changes
+_sent_dms_index: Optional[Dict[str, Tuple[str, Optional[str]]]] = None
+_sent_dms_last_send: Dict[str, str] = {}  # account_username -> latest sent_at
+_sent_dms_mtime = -1  # st_mtime_ns
+SETTINGS_FILE = os.path.join(os.path.dirname(__file__), "..", "settings.json")
+# path -> (st_mtime_ns, parsed dict) for settings.json / campaigns.json
+_json_cache: Dict[str, Tuple[int, dict]] = {}
+_json_cache_lock = threading.Lock()
+# Pooled keep-alive connections for new_lead webhooks
+_webhook_session = requests.Session()
+_webhook_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=Retry(total=2, backoff_factor=0.2))
+_webhook_session.mount("http://", _webhook_adapter)
+_webhook_session.mount("https://", _webhook_adapter)
+# Webhooks waiting for the sender thread (started lazily by _enqueue_webhook)
+WEBHOOK_QUEUE_SIZE = 1000
+_webhook_queue: "queue.Queue[Tuple[str, dict]]" = queue.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+_webhook_thread: Optional[threading.Thread] = None
+_webhook_thread_lock = threading.Lock()
+# Per-account FIFO of processed message ids (persisted under SEEN_REPLIES_DIR)
+SEEN_IDS_PER_ACCOUNT = 2000
+_seen_ids: Dict[str, "OrderedDict[str, None]"] = {}
+_seen_ids_dirty = set()
+_seen_ids_lock = threading.Lock()
+# Decrypted JSON accounts keyed by saved_accounts.json st_mtime_ns
+_accounts_cache: Optional[Tuple[int, List[Dict]]] = None
+# direct_messages page sizes: a small first page, a bigger one when all of it is unread
+DIRECT_MESSAGES_FIRST_PAGE = 3
+DIRECT_MESSAGES_FULL_PAGE = 20
+# Max accounts polled at once
+REPLY_MONITOR_MAX_WORKERS = 8
 
 
 def _get_accounts_for_monitor() -> List[Dict]:
@@ -48,24 +111,24 @@ def _get_accounts_for_monitor() -> List[Dict]:
         try:
             from .services.database import DatabaseService
             db = DatabaseService.get_instance()
-            # get_accounts() returns minimal; we need full account with password/session for login
-            rows = db.client.table("accounts").select("username").execute()
-            for row in (rows.data or []):
-                username = row.get("username")
-                if not username:
-                    continue
-                acc = db.get_account(username)
-                if acc and (acc.get("password") or acc.get("session_cookies")):
+            # get_accounts() returns minimal; we need full accounts with password/session for login (one query)
+            for acc in db.get_accounts_with_credentials():
+                if acc.get("password") or acc.get("session_cookies"):
                     accounts_list.append(acc)
         except Exception as e:
             print(f"[ReplyMonitor] Supabase get_accounts error: {e}")
         return accounts_list
-    # JSON: load and decrypt
-    if not os.path.exists(ACCOUNTS_FILE):
+    # JSON: load and decrypt, reusing the last result while saved_accounts.json is unchanged
+    global _accounts_cache
+    try:
+        mtime_ns = os.stat(ACCOUNTS_FILE).st_mtime_ns
+    except OSError:
         return []
+    if _accounts_cache is not None and _accounts_cache[0] == mtime_ns:
+        return _accounts_cache[1]
     try:
-        with open(ACCOUNTS_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open(ACCOUNTS_FILE, "rb") as f:
+            data = jsonio.loads(f.read())
         if not isinstance(data, dict):
             return []
     except Exception:
@@ -73,28 +136,23 @@ def _get_accounts_for_monitor() -> List[Dict]:
     if not os.path.exists(KEY_FILE):
         return []
     try:
-        from cryptography.fernet import Fernet
-        import base64
-        with open(KEY_FILE, "rb") as f:
-            key = f.read()
-        fernet = Fernet(key)
         for username, raw in data.items():
             password = None
             if raw.get("password"):
                 try:
-                    password = fernet.decrypt(base64.b64decode(raw["password"])).decode()
+                    password = decrypt_field(raw["password"])
                 except Exception:
                     pass
             proxy = None
             if raw.get("proxy"):
                 try:
-                    proxy = fernet.decrypt(base64.b64decode(raw["proxy"])).decode()
+                    proxy = decrypt_field(raw["proxy"])
                 except Exception:
                     pass
             session_cookies = None
             if raw.get("session_cookies"):
                 try:
-                    session_cookies = fernet.decrypt(base64.b64decode(raw["session_cookies"])).decode()
+                    session_cookies = decrypt_field(raw["session_cookies"])
                 except Exception:
                     pass
             if password or session_cookies:
@@ -107,6 +165,8 @@ def _get_accounts_for_monitor() -> List[Dict]:
                 })
     except Exception as e:
         print(f"[ReplyMonitor] JSON decrypt error: {e}")
+        return accounts_list
+    _accounts_cache = (mtime_ns, accounts_list)
     return accounts_list
 
 
@@ -122,6 +182,7 @@ def _append_reply(
     replied_to_text: str,
     message_id: str,
     message_type: str = "reply",  # "reply" or "inbound"
+    timestamp: Optional[str] = None,
 ) -> None:
     # Write to Supabase if enabled
     if STORAGE_MODE == "supabase":
@@ -138,71 +199,290 @@ def _append_reply(
         except Exception as e:
             print(f"[ReplyMonitor] Failed to write to Supabase: {e}")
     
-    # Also write to CSV as backup
+    # Also write to CSV as backup (buffered; written by _flush_replies_csv at the end of the account pass)
+    _queue_reply((
+        timestamp or datetime.now().isoformat(),
+        account_username,
+        account_name,
+        campaign_id or "",
+        thread_id,
+        (thread_title or "")[:200],
+        replier_user_id,
+        replier_username or "",
+        (reply_text or "")[:2000],
+        (replied_to_text or "")[:2000],
+        message_id or "",
+        message_type or "reply",
+    ))
+
+
+def _queue_reply(row: tuple) -> None:
+    """Buffer one replies.csv row."""
     with _replies_csv_lock:
+        _pending_reply_rows.append(row)
+
+
+def _flush_replies_csv() -> None:
+    """Append all buffered rows to replies.csv with a single open/write."""
+    with _replies_csv_lock:
+        if not _pending_reply_rows:
+            return
+        rows = _pending_reply_rows[:]
+        _pending_reply_rows.clear()
+        global _replies_header_written
         try:
-            file_exists = os.path.isfile(REPLIES_CSV)
-            with open(REPLIES_CSV, "a", newline="", encoding="utf-8") as f:
+            # Only stat until the file is known to exist; nothing else in the app deletes it
+            write_header = not _replies_header_written and not os.path.isfile(REPLIES_CSV)
+            with open(REPLIES_CSV, "a", newline="", encoding="utf-8", buffering=64 * 1024) as f:
+                size_before = os.fstat(f.fileno()).st_size
                 w = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
-                if not file_exists:
+                if write_header:
                     w.writerow(REPLIES_CSV_HEADER)
-                w.writerow((
-                    datetime.now().isoformat(),
-                    account_username,
-                    account_name,
-                    campaign_id or "",
-                    thread_id,
-                    (thread_title or "")[:200],
-                    replier_user_id,
-                    replier_username or "",
-                    (reply_text or "")[:2000],
-                    (replied_to_text or "")[:2000],
-                    message_id or "",
-                    message_type or "reply",
-                ))
+                w.writerows(rows)
+            _replies_header_written = True
         except Exception as e:
             print(f"[ReplyMonitor] Failed to append replies.csv: {e}")
+            return
+        try:
+            _update_daily_counts(rows, size_before, os.path.getsize(REPLIES_CSV))
+        except Exception as e:
+            print(f"[ReplyMonitor] Failed to update {REPLIES_DAILY_COUNTS_FILE}: {e}")
+
+
+def _message_type_key(message_type: str) -> str:
+    return "inbound" if (message_type or "").strip().lower() == "inbound" else "reply"
+
+
+def _scan_daily_counts() -> Dict[str, Dict[str, int]]:
+    """Count every replies.csv row per day and message type (used to (re)build the index)."""
+    days: Dict[str, Dict[str, int]] = {}
+    with open(REPLIES_CSV, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0] in ("", "timestamp"):
+                continue
+            try:
+                day = datetime.fromisoformat(row[0].replace("Z", "+00:00")).date().isoformat()
+            except ValueError:
+                continue
+            message_type = row[11] if len(row) > 11 else ""
+            bucket = days.setdefault(day, {"reply": 0, "inbound": 0})
+            bucket[_message_type_key(message_type)] += 1
+    return days
+
+
+def _update_daily_counts(rows: List[tuple], size_before: int, size_after: int) -> None:
+    """Add just-appended rows to the per-day counts file. Call with _replies_csv_lock held.
+    Rebuilds from replies.csv when the index is missing or does not match the file it counted."""
+    global _daily_counts
+    if _daily_counts is None or _daily_counts.get("csv_size") != size_before:
+        try:
+            with open(REPLIES_DAILY_COUNTS_FILE, "rb") as f:
+                _daily_counts = jsonio.loads(f.read())
+        except (OSError, ValueError):
+            _daily_counts = None
+        if not isinstance(_daily_counts, dict) or _daily_counts.get("csv_size") != size_before:
+            _daily_counts = {"days": _scan_daily_counts()}
+            rows = []  # the scan already includes them
+    days = _daily_counts["days"]
+    for row in rows:
+        bucket = days.setdefault(row[0][:10], {"reply": 0, "inbound": 0})
+        bucket[_message_type_key(row[11])] += 1
+    _daily_counts["csv_size"] = size_after
+    tmp = REPLIES_DAILY_COUNTS_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(jsonio.dumps(_daily_counts))
+    os.replace(tmp, REPLIES_DAILY_COUNTS_FILE)
+
+
+def _refresh_sent_dms_index() -> bool:
+    """Rebuild the sent_dms.json indexes if the file changed. Call with _sent_dms_lock held. False if unreadable."""
+    global _sent_dms_index, _sent_dms_last_send, _sent_dms_mtime
+    try:
+        mtime = os.stat(SENT_DMS_FILE).st_mtime_ns
+    except OSError:
+        return False
+    if _sent_dms_index is not None and mtime == _sent_dms_mtime:
+        return True
+    # Keep only the latest send per recipient (first one wins on equal sent_at) and per sending account.
+    # Entries are streamed with ijson when available so the whole array is never in memory.
+    index: Dict[str, Tuple[str, Optional[str]]] = {}
+    last_send: Dict[str, str] = {}
+    try:
+        with open(SENT_DMS_FILE, "rb") as f:
+            for d in (ijson.items(f, "item") if ijson else jsonio.loads(f.read())):
+                recipient = d.get("recipient_username")
+                sent_at = d.get("sent_at", "")
+                best = index.get(recipient)
+                if best is None or sent_at > best[0]:
+                    index[recipient] = (sent_at, d.get("campaign_id"))
+                account = d.get("account_username")
+                if account and sent_at > last_send.get(account, ""):
+                    last_send[account] = sent_at
+    except Exception:
+        return False
+    _sent_dms_index = index
+    _sent_dms_last_send = last_send
+    _sent_dms_mtime = mtime
+    return True
 
 
 def _find_campaign_for_recipient(replier_username: str) -> Optional[str]:
     """Find the most recent campaign_id for a recipient_username from sent_dms.json."""
     with _sent_dms_lock:
-        try:
-            with open(SENT_DMS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
+        if not _refresh_sent_dms_index():
             return None
-    matching = [d for d in data if d.get("recipient_username") == replier_username]
-    if not matching:
-        return None
-    # Sort by sent_at descending
-    matching.sort(key=lambda x: x.get("sent_at", ""), reverse=True)
-    return matching[0].get("campaign_id")
+        entry = _sent_dms_index.get(replier_username)
+    return entry[1] if entry else None
 
 
-def _get_global_settings():
-    """Get global settings from settings.json."""
+def _recently_active_accounts(days: int) -> Optional[set]:
+    """Usernames that sent a DM in the last `days` days, or None if sent_dms.json can't be read."""
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+    with _sent_dms_lock:
+        if not _refresh_sent_dms_index():
+            return None
+        return {account for account, sent_at in _sent_dms_last_send.items() if sent_at >= cutoff}
+
+
+def _load_json_cached(path: str) -> dict:
+    """Parsed JSON dict for path, re-read only when its mtime changes. Returns {} if missing/invalid; do not mutate."""
     try:
-        with open(os.path.join(os.path.dirname(__file__), "..", "settings.json"), "r", encoding="utf-8") as f:
-            return json.load(f)
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    with _json_cache_lock:
+        cached = _json_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    try:
+        with open(path, "rb") as f:
+            data = jsonio.loads(f.read())
     except Exception:
         return {}
+    if not isinstance(data, dict):
+        data = {}
+    with _json_cache_lock:
+        _json_cache[path] = (mtime, data)
+    return data
 
 
-def _process_unread_replies_for_account(
-    account: Dict,
-    broadcast_sync: Optional[Callable[[dict], None]],
-) -> None:
-    """One pass: login (session/password), fetch unread threads, detect new replies, append + broadcast."""
+def _get_global_settings():
+    """Get global settings from settings.json."""
+    return _load_json_cached(SETTINGS_FILE)
+
+
+def _resolve_webhook_target(campaign_id: str, global_settings: dict) -> Tuple[Optional[str], str]:
+    """(url, secret) for new_lead webhooks: the campaign's webhook_url, else the global one if subscribed."""
+    if STORAGE_MODE == "supabase":
+        try:
+            from .services.database import DatabaseService
+            db = DatabaseService.get_instance()
+            campaign = db.get_campaign(campaign_id)
+        except Exception:
+            campaign = None
+    else:
+        campaign = _load_json_cached(CAMPAIGNS_FILE).get(campaign_id)
+    if campaign and campaign.get("webhook_url"):
+        return campaign["webhook_url"], ""
+    # Fallback to global
+    if global_settings.get("global_webhook_url") and "new_lead" in global_settings.get("webhook_events", []):
+        return global_settings["global_webhook_url"], global_settings.get("webhook_secret", "")
+    return None, ""
+
+
+def _webhook_worker() -> None:
+    """Background thread: POST queued webhooks so polling never waits on the endpoint."""
+    while True:
+        url, payload = _webhook_queue.get()
+        try:
+            _webhook_session.post(url, data=jsonio.dumps(payload), headers={"Content-Type": "application/json"}, timeout=(3, 10))
+        except Exception as e:
+            print(f"[Webhook] Failed to send for campaign {payload.get('campaign_id') or 'global'}: {e}")
+        finally:
+            _webhook_queue.task_done()
+
+
+def _enqueue_webhook(url: str, payload: dict) -> None:
+    """Queue a webhook POST, starting the sender thread on first use. Drops the webhook if the queue is full."""
+    global _webhook_thread
+    with _webhook_thread_lock:
+        if _webhook_thread is None:
+            _webhook_thread = threading.Thread(target=_webhook_worker, daemon=True)
+            _webhook_thread.start()
+    try:
+        _webhook_queue.put_nowait((url, payload))
+    except queue.Full:
+        print(f"[Webhook] Queue full, dropping webhook for campaign {payload.get('campaign_id') or 'global'}")
+
+
+def _seen_ids_path(username: str) -> str:
+    return os.path.join(SEEN_REPLIES_DIR, f"{username}.json")
+
+
+def _get_seen_ids(username: str) -> "OrderedDict[str, None]":
+    """Recently processed message ids for an account, loaded from disk on first use."""
+    with _seen_ids_lock:
+        seen = _seen_ids.get(username)
+        if seen is None:
+            seen = OrderedDict()
+            try:
+                with open(_seen_ids_path(username), "rb") as f:
+                    for msg_id in jsonio.loads(f.read())[-SEEN_IDS_PER_ACCOUNT:]:
+                        seen[str(msg_id)] = None
+            except Exception:
+                pass
+            _seen_ids[username] = seen
+        return seen
+
+
+def _mark_seen(username: str, seen: "OrderedDict[str, None]", msg_id: str) -> None:
+    """Remember msg_id, evicting the oldest ids past SEEN_IDS_PER_ACCOUNT."""
+    seen[msg_id] = None
+    while len(seen) > SEEN_IDS_PER_ACCOUNT:
+        seen.popitem(last=False)
+    _seen_ids_dirty.add(username)
+
+
+def _save_seen_ids(username: str) -> None:
+    """Persist an account's seen ids if any were added this pass, so restarts don't re-process them."""
+    with _seen_ids_lock:
+        if username not in _seen_ids_dirty:
+            return
+        _seen_ids_dirty.discard(username)
+        ids = list(_seen_ids.get(username) or ())
+    try:
+        os.makedirs(SEEN_REPLIES_DIR, exist_ok=True)
+        path = _seen_ids_path(username)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(jsonio.dumps(ids))
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"[ReplyMonitor] Failed to save seen message ids for @{username}: {e}")
+
+
+# Logged-in clients are reused across polls and rebuilt after this many seconds or on auth failure
+CLIENT_CACHE_TTL = 3600
+_client_cache: Dict[str, Tuple[object, float]] = {}  # username -> (instagrapi client, logged_in_at)
+_client_cache_lock = threading.Lock()
+
+
+def invalidate(username: str) -> None:
+    """Drop the cached client for username so the next poll logs in again."""
+    with _client_cache_lock:
+        _client_cache.pop(username, None)
+
+
+def _login_client(account: Dict):
+    """Log in with session/password via InstagramLoginHelper. Returns the client or None."""
     username = account.get("username") or ""
-    account_name = account.get("account_name") or username
     password = account.get("password") or ""
     proxy = account.get("proxy") or None
     session_cookies = account.get("session_cookies") or None
     sessionid = None
     if session_cookies:
         try:
-            parsed = json.loads(session_cookies)
+            parsed = jsonio.loads(session_cookies)
             if isinstance(parsed, dict) and parsed.get("sessionid"):
                 sessionid = parsed["sessionid"]
             elif isinstance(parsed, str):
@@ -220,26 +500,80 @@ def _process_unread_replies_for_account(
     )
     try:
         if not helper.login():
-            return
+            return None
     except Exception as e:
         print(f"[ReplyMonitor] Login failed for @{username}: {e}")
-        return
-    cl = helper.client
-    my_user_id = getattr(cl, "user_id", None)
-    if my_user_id is None:
+        return None
+    return helper.client
+
+
+def _get_client(account: Dict):
+    """Return a cached logged-in client for the account, logging in when missing or older than CLIENT_CACHE_TTL."""
+    username = account.get("username") or ""
+    with _client_cache_lock:
+        cached = _client_cache.get(username)
+    if cached and time.time() - cached[1] < CLIENT_CACHE_TTL:
+        return cached[0]
+    cl = _login_client(account)
+    with _client_cache_lock:
+        if cl is None:
+            _client_cache.pop(username, None)
+        else:
+            _client_cache[username] = (cl, time.time())
+    return cl
+
+
+def _epoch_seconds(value) -> int:
+    """Unix seconds from a datetime, number or numeric string; Instagram ms/us timestamps are scaled down. 0 if unknown."""
+    if value is None:
+        return 0
+    if hasattr(value, "timestamp"):
+        # datetime.datetime from instagrapi
+        return int(value.timestamp())
+    try:
+        ts = int(value)
+    except (TypeError, ValueError):
+        return 0
+    if ts > 10**14:
+        return ts // 10**6
+    if ts > 10**11:
+        return ts // 10**3
+    return ts
+
+
+def _process_unread_replies_for_account(
+    account: Dict,
+    broadcast_sync: Optional[Callable[[Any], None]],
+) -> None:
+    """One pass: get a logged-in client (cached), fetch unread threads, detect new replies, append + broadcast."""
+    from instagrapi.exceptions import ClientUnauthorizedError, LoginRequired
+    username = account.get("username") or ""
+    account_name = account.get("account_name") or username
+    threads = None
+    for attempt in range(2):
+        cl = _get_client(account)
+        if cl is None:
+            return
         try:
-            my_user_id = cl.user_id
-        except Exception:
-            pass
+            # Fetch threads with unread messages
+            threads = cl.direct_threads(amount=10, selected_filter="unread")
+            break
+        except (LoginRequired, ClientUnauthorizedError) as e:
+            # Cached session went stale: drop it and retry once with a fresh login
+            invalidate(username)
+            if attempt:
+                print(f"[ReplyMonitor] direct_threads failed for @{username}: {e}")
+                return
+        except Exception as e:
+            print(f"[ReplyMonitor] direct_threads failed for @{username}: {e}")
+            return
+    my_user_id = getattr(cl, "user_id", None)
     if my_user_id is None:
         return
     my_user_id_str = str(my_user_id)
-    try:
-        # Fetch threads with unread messages
-        threads = cl.direct_threads(amount=10, selected_filter="unread")
-    except Exception as e:
-        print(f"[ReplyMonitor] direct_threads failed for @{username}: {e}")
-        return
+    seen_ids = _get_seen_ids(username)
+    global_settings = _get_global_settings()
+    webhook_targets: Dict[str, Tuple[Optional[str], str]] = {}  # campaign_id -> (url, secret)
     for thread in (threads or []):
         thread_id = getattr(thread, "id", None) or getattr(thread, "thread_id", None)
         thread_title = getattr(thread, "thread_title", None) or getattr(thread, "title", "") or ""
@@ -249,43 +583,49 @@ def _process_unread_replies_for_account(
             if isinstance(last_seen, dict) and my_user_id_str in last_seen:
                 t = last_seen[my_user_id_str]
                 if isinstance(t, dict) and "timestamp" in t:
-                    last_read_ts = int(t["timestamp"])
+                    last_read_ts = _epoch_seconds(t["timestamp"])
                 elif isinstance(t, (int, float)):
-                    last_read_ts = int(t)
+                    last_read_ts = _epoch_seconds(t)
             elif hasattr(last_seen, "get") and last_seen.get(my_user_id_str):
                 t = last_seen[my_user_id_str]
-                last_read_ts = int(t.get("timestamp", t) if isinstance(t, dict) else t)
+                last_read_ts = _epoch_seconds(t.get("timestamp", t) if isinstance(t, dict) else t)
+        # Nothing happened in the thread since we last read it: skip the messages request
+        last_activity = _epoch_seconds(getattr(thread, "last_activity_at", None))
+        if last_activity and last_activity <= last_read_ts:
+            continue
         try:
-            messages = cl.direct_messages(thread_id, amount=10)
+            # Small first page; fetch a bigger one only if every message on it is unread
+            messages = cl.direct_messages(thread_id, amount=DIRECT_MESSAGES_FIRST_PAGE)
+            if messages and len(messages) >= DIRECT_MESSAGES_FIRST_PAGE and min(
+                _epoch_seconds(getattr(m, "timestamp", None) or getattr(m, "created_at", 0)) for m in messages
+            ) > last_read_ts:
+                messages = cl.direct_messages(thread_id, amount=DIRECT_MESSAGES_FULL_PAGE)
+        except (LoginRequired, ClientUnauthorizedError):
+            invalidate(username)
+            return
         except Exception:
             continue
         for msg in (messages or []):
-            msg_ts = getattr(msg, "timestamp", None) or getattr(msg, "created_at", 0)
-            if isinstance(msg_ts, str):
-                try:
-                    msg_ts = int(msg_ts)
-                except ValueError:
-                    msg_ts = 0
-            elif hasattr(msg_ts, "timestamp"):
-                # datetime.datetime from instagrapi
-                msg_ts = int(msg_ts.timestamp())
-            elif not isinstance(msg_ts, (int, float)):
-                msg_ts = 0
-            msg_ts = int(msg_ts)
+            msg_ts = _epoch_seconds(getattr(msg, "timestamp", None) or getattr(msg, "created_at", 0))
             msg_user_id = str(getattr(msg, "user_id", "") or "")
-            is_new = msg_ts > int(last_read_ts)
+            is_new = msg_ts > last_read_ts
             # Only process new messages from the other person (not from us)
             if not is_new or msg_user_id == my_user_id_str:
                 continue
+            msg_id = str(getattr(msg, "id", "") or getattr(msg, "message_id", "") or "")
+            # Thread read-state may lag, so the same message can come back on later polls
+            if msg_id and msg_id in seen_ids:
+                continue
             replied_to = getattr(msg, "replied_to_message", None)
             message_type = "reply" if replied_to is not None else "inbound"
             orig_text = ""
             if replied_to is not None:
                 orig_text = getattr(replied_to, "text", None) or getattr(replied_to, "message", "") or ""
             reply_text = getattr(msg, "text", None) or getattr(msg, "message", "") or ""
-            msg_id = str(getattr(msg, "id", "") or getattr(msg, "message_id", "") or "")
             replier_username = getattr(msg, "username", None) or ""
             campaign_id = _find_campaign_for_recipient(replier_username)
+            # One timestamp shared by the CSV row, UI broadcast and webhook
+            received_at = datetime.now().isoformat()
             _append_reply(
                 account_username=username,
                 account_name=account_name,
@@ -298,48 +638,28 @@ def _process_unread_replies_for_account(
                 replied_to_text=orig_text,
                 message_id=msg_id,
                 message_type=message_type,
+                timestamp=received_at,
             )
             if broadcast_sync:
                 try:
-                    broadcast_sync({
-                        "type": "new_reply",
-                        "account_username": username,
-                        "account_name": account_name,
-                        "thread_title": thread_title,
-                        "replier_username": replier_username,
-                        "reply_text": (reply_text or "")[:200],
-                        "message_type": message_type,
-                        "timestamp": datetime.now().isoformat(),
-                    })
+                    broadcast_sync(ReplyEvent(
+                        account_username=username,
+                        account_name=account_name,
+                        thread_title=thread_title,
+                        replier_username=replier_username,
+                        reply_text=(reply_text or "")[:200],
+                        message_type=message_type,
+                        timestamp=received_at,
+                    ))
                 except Exception:
                     pass
-            # Send webhook if linked to campaign or global
+            # Send webhook if linked to campaign or global (resolved once per campaign per poll)
             url = None
             secret = ""
             if campaign_id:
-                # Load campaign
-                if STORAGE_MODE == "supabase":
-                    try:
-                        from .services.database import DatabaseService
-                        db = DatabaseService.get_instance()
-                        campaign = db.get_campaign(campaign_id)
-                    except Exception:
-                        campaign = None
-                else:
-                    try:
-                        with open(CAMPAIGNS_FILE, "r", encoding="utf-8") as f:
-                            campaigns = json.load(f)
-                        campaign = campaigns.get(campaign_id)
-                    except Exception:
-                        campaign = None
-                if campaign and campaign.get("webhook_url"):
-                    url = campaign["webhook_url"]
-                else:
-                    # Fallback to global
-                    global_settings = _get_global_settings()
-                    if global_settings.get("global_webhook_url") and "new_lead" in global_settings.get("webhook_events", []):
-                        url = global_settings["global_webhook_url"]
-                        secret = global_settings.get("webhook_secret", "")
+                if campaign_id not in webhook_targets:
+                    webhook_targets[campaign_id] = _resolve_webhook_target(campaign_id, global_settings)
+                url, secret = webhook_targets[campaign_id]
             if url:
                 payload = {
                     "event": "new_lead",
@@ -350,33 +670,52 @@ def _process_unread_replies_for_account(
                     "replied_to_message_text": (orig_text or "")[:1000],
                     "message_type": message_type,
                     "thread_id": str(thread_id or ""),
-                    "timestamp": datetime.now().isoformat(),
+                    "timestamp": received_at,
                     "app_version": "1.0",
                     "secret": secret
                 }
-                try:
-                    requests.post(url, json=payload, timeout=10)
-                except Exception as e:
-                    print(f"[Webhook] Failed to send for campaign {campaign_id or 'global'}: {e}")
-    # Small delay between accounts to avoid hammering
-    time.sleep(2)
+                _enqueue_webhook(url, payload)
+            if msg_id:
+                _mark_seen(username, seen_ids, msg_id)
+
 
+def _poll_account(account: Dict, broadcast_sync: Optional[Callable[[Any], None]]) -> None:
+    """Pool task: small jitter so accounts don't hit Instagram in lockstep, then one pass for the account, a replies.csv flush and a seen-id save."""
+    time.sleep(random.uniform(0, 0.5))
+    try:
+        _process_unread_replies_for_account(account, broadcast_sync)
+    except Exception as e:
+        print(f"[ReplyMonitor] Error processing @{account.get('username', '?')}: {e}")
+    finally:
+        _flush_replies_csv()
+        _save_seen_ids(account.get("username") or "")
 
-def run_reply_monitor_loop(broadcast_sync: Optional[Callable[[dict], None]] = None) -> None:
-    """Run forever: get accounts, process unread replies for each, sleep REPLY_POLL_INTERVAL."""
+
+def run_reply_monitor_loop(broadcast_sync: Optional[Callable[[Any], None]] = None) -> None:
+    """Run forever: get accounts, process unread replies for each, once every REPLY_POLL_INTERVAL seconds."""
     print("[ReplyMonitor] Started reply monitor loop.")
+    # Polls start every REPLY_POLL_INTERVAL seconds regardless of how long each poll takes
+    next_tick = time.monotonic() + REPLY_POLL_INTERVAL
     while True:
         try:
             accounts = _get_accounts_for_monitor()
-            if not accounts:
-                time.sleep(REPLY_POLL_INTERVAL)
-                continue
-            for acc in accounts:
-                try:
-                    _process_unread_replies_for_account(acc, broadcast_sync)
-                except Exception as e:
-                    print(f"[ReplyMonitor] Error processing @{acc.get('username', '?')}: {e}")
-                time.sleep(1)
+            if accounts and REPLY_MONITOR_ACTIVE_DAYS > 0:
+                # Skip accounts with no recent outreach unless a global new_lead webhook wants every inbound
+                global_settings = _get_global_settings()
+                if not (global_settings.get("global_webhook_url") and "new_lead" in global_settings.get("webhook_events", [])):
+                    active = _recently_active_accounts(REPLY_MONITOR_ACTIVE_DAYS)
+                    if active is not None:
+                        accounts = [acc for acc in accounts if acc.get("username") in active]
+            if accounts:
+                # Accounts use independent sessions, so poll them concurrently
+                with ThreadPoolExecutor(max_workers=min(len(accounts), REPLY_MONITOR_MAX_WORKERS)) as ex:
+                    list(ex.map(lambda acc: _poll_account(acc, broadcast_sync), accounts))
         except Exception as e:
             print(f"[ReplyMonitor] Loop error: {e}")
-        time.sleep(REPLY_POLL_INTERVAL)
+        now = time.monotonic()
+        if now >= next_tick:
+            # Poll overran the interval: start the next one now and re-anchor instead of bursting to catch up
+            next_tick = now
+        else:
+            time.sleep(next_tick - now)
+        next_tick += REPLY_POLL_INTERVAL
@@ -1,26 +1,63 @@
-from fastapi import APIRouter, HTTPException, File, UploadFile
+from fastapi import APIRouter, HTTPException, File, UploadFile, Query
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
 from typing import List, Dict, Optional, Tuple
 import csv
 import io
+import itertools
 import json
 import os
-import base64
 import uuid
+import asyncio
 import threading
-import time
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from cryptography.fernet import Fernet
 
-from ..config import ACCOUNTS_FILE, KEY_FILE, STORAGE_MODE, SESSIONS_DIR
+from .. import jsonio
+from ..config import ACCOUNTS_FILE, STORAGE_MODE, SESSIONS_DIR
+from ..encryption import encrypt_field
 from ..instagram_login import InstagramLoginHelper
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse if jsonio.ORJSON_AVAILABLE else JSONResponse)
 
-# Account verification: 2FA and result state (keyed by verification_id)
+
+# Request bodies. Fields are optional (null or missing allowed) so the handlers keep returning
+# their own 400 messages (shown by the UI) for missing values; pydantic only enforces the types.
+class CreateAccountIn(BaseModel):
+    username: Optional[str] = None
+    password: Optional[str] = ""
+    account_name: Optional[str] = None
+    proxy: Optional[str] = ""
+    session_cookies: Optional[str] = ""
+
+
+class VerifyLoginIn(BaseModel):
+    username: Optional[str] = None
+    password: Optional[str] = None
+    proxy: Optional[str] = None
+
+
+class ChallengeCodeIn(BaseModel):
+    verification_id: Optional[str] = None
+    code: Optional[str] = ""
+
+
+# Account verification: 2FA and result state (keyed by verification_id). Result dicts are
+# never mutated, only replaced, so readers use plain dict lookups; writers that must
+# check-then-set take the lock shard for their id.
 _verification_pending: Dict[str, dict] = {}
 _verification_results: Dict[str, dict] = {}
-_verification_lock = threading.Lock()
+VERIFICATION_LOCK_SHARDS = 16
+_verification_locks = [threading.Lock() for _ in range(VERIFICATION_LOCK_SHARDS)]
+
+
+def _verification_lock(verification_id: str) -> threading.Lock:
+    return _verification_locks[hash(verification_id) % VERIFICATION_LOCK_SHARDS]
+
+# Runs verification logins; bounds concurrent Instagram login attempts
+VERIFY_MAX_WORKERS = 32
+_verify_pool = ThreadPoolExecutor(max_workers=VERIFY_MAX_WORKERS, thread_name_prefix="verify")
 
 # Initialize database service if using Supabase
 db_service = None
@@ -33,32 +70,89 @@ if STORAGE_MODE == "supabase":
         print(f"Warning: Could not initialize Supabase: {e}")
         print("Falling back to JSON storage")
 
-def get_or_create_key():
-    """Get or create encryption key"""
-    if os.path.exists(KEY_FILE):
-        with open(KEY_FILE, "rb") as f:
-            return f.read()
-    else:
-        key = Fernet.generate_key()
-        with open(KEY_FILE, "wb") as f:
-            f.write(key)
-        return key
+# Rows per worker-thread batch in bulk import
+IMPORT_BATCH_SIZE = 500
+# Encrypts JSON-mode import rows in parallel
+_import_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="account-import")
+# Accepted CSV headers per import field (already casefolded), in order of preference
+IMPORT_COLUMN_ALIASES = {
+    "username": ("username", "user", "instagram", "handle"),
+    "password": ("password", "pass"),
+    "account_name": ("account_name", "display_name", "name"),
+    "sessionid": ("sessionid", "session_id", "session"),
+    "proxy": ("proxy",),
+}
+
+# JSON mode: handlers work on an in-memory copy of ACCOUNTS_FILE, loaded on first use, and
+# mark it dirty; flush_accounts (run periodically by main) writes changes out in one go.
+# The lock serializes mutations with each other and with the flush.
+_accounts_file_lock = asyncio.Lock()
+_accounts_mem: Optional[Dict] = None
+_accounts_dirty = False
+
+# Parsed ACCOUNTS_FILE keyed by its st_mtime_ns; callers get a shallow copy they may modify
+_accounts_cache: Optional[Tuple[int, Dict]] = None
+_accounts_cache_lock = threading.Lock()
+
 
 def load_accounts() -> Dict:
-    """Load accounts from JSON file"""
-    if not os.path.exists(ACCOUNTS_FILE):
+    """Load accounts from JSON file (re-read only when the file has changed)"""
+    global _accounts_cache
+    try:
+        mtime_ns = os.stat(ACCOUNTS_FILE).st_mtime_ns
+    except OSError:
         return {}
+    with _accounts_cache_lock:
+        if _accounts_cache is not None and _accounts_cache[0] == mtime_ns:
+            return dict(_accounts_cache[1])
     try:
-        with open(ACCOUNTS_FILE, "r", encoding='utf-8') as f:
-            data = json.load(f)
-        return data if isinstance(data, dict) else {}
+        with open(ACCOUNTS_FILE, "rb") as f:
+            data = jsonio.loads(f.read())
     except Exception:
         return {}
+    if not isinstance(data, dict):
+        return {}
+    with _accounts_cache_lock:
+        _accounts_cache = (mtime_ns, data)
+    return dict(data)
 
 def save_accounts(accounts: Dict):
-    """Save accounts to JSON file"""
-    with open(ACCOUNTS_FILE, "w", encoding='utf-8') as f:
-        json.dump(accounts, f, indent=2)
+    """Save accounts to JSON file (written to a temp file, then swapped in atomically)"""
+    global _accounts_cache
+    tmp = ACCOUNTS_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        # Compact: the whole file is rewritten on every change, and it is mostly ciphertext
+        f.write(jsonio.dumps(accounts))
+    with _accounts_cache_lock:
+        os.replace(tmp, ACCOUNTS_FILE)
+        _accounts_cache = (os.stat(ACCOUNTS_FILE).st_mtime_ns, dict(accounts))
+
+
+async def _get_accounts_mem() -> Dict:
+    """In-memory JSON-mode accounts (loaded from ACCOUNTS_FILE on first use)"""
+    global _accounts_mem
+    if _accounts_mem is None:
+        _accounts_mem = await asyncio.to_thread(load_accounts)
+    return _accounts_mem
+
+
+def _mark_accounts_dirty():
+    global _accounts_dirty
+    _accounts_dirty = True
+
+
+async def flush_accounts():
+    """Write the in-memory accounts to ACCOUNTS_FILE if they changed since the last flush"""
+    global _accounts_dirty
+    async with _accounts_file_lock:
+        if not _accounts_dirty:
+            return
+        _accounts_dirty = False
+        try:
+            await asyncio.to_thread(save_accounts, _accounts_mem)
+        except Exception:
+            _accounts_dirty = True
+            raise
 
 
 def _create_one_account(
@@ -77,7 +171,7 @@ def _create_one_account(
         return (False, "Either password or session cookies are required")
     if session_cookies:
         try:
-            json.loads(session_cookies)
+            jsonio.loads(session_cookies)
         except json.JSONDecodeError:
             return (False, "Session cookies must be valid JSON")
     account_name = (account_name or username).strip() or username
@@ -99,54 +193,78 @@ def _create_one_account(
         accounts = accounts_dict if accounts_dict is not None else load_accounts()
         if username in accounts and accounts_dict is None:
             return (False, "Username already exists")
-        key = get_or_create_key()
-        fernet = Fernet(key)
-        encrypted_password = None
-        if password:
-            encrypted_password = fernet.encrypt(password.encode())
-        encrypted_session_cookies = None
-        if session_cookies:
-            encrypted_session_cookies = fernet.encrypt(session_cookies.encode())
         accounts[username] = {
             "account_name": account_name or username,
             "created_at": datetime.now().timestamp(),
         }
-        if encrypted_password:
-            accounts[username]["password"] = base64.b64encode(encrypted_password).decode()
-        if encrypted_session_cookies:
-            accounts[username]["session_cookies"] = base64.b64encode(encrypted_session_cookies).decode()
+        if password:
+            accounts[username]["password"] = encrypt_field(password)
+        if session_cookies:
+            accounts[username]["session_cookies"] = encrypt_field(session_cookies)
         if proxy:
-            encrypted_proxy = fernet.encrypt(proxy.encode())
-            accounts[username]["proxy"] = base64.b64encode(encrypted_proxy).decode()
+            accounts[username]["proxy"] = encrypt_field(proxy)
         if accounts_dict is None:
             save_accounts(accounts)
         return (True, None)
 
 
 def _get_or_create_pending(verification_id: str) -> dict:
-    with _verification_lock:
+    """Pending slot: "event"/"code" carry the 2FA code in; "status_event" fires on the first non-pending status, "terminal_event" on success/error."""
+    with _verification_lock(verification_id):
         if verification_id not in _verification_pending:
-            _verification_pending[verification_id] = {"event": threading.Event(), "code": None}
+            _verification_pending[verification_id] = {
+                "event": threading.Event(),
+                "code": None,
+                "status_event": threading.Event(),
+                "terminal_event": threading.Event(),
+            }
         return _verification_pending[verification_id]
 
 
+def _set_verification_result(verification_id: str, result: dict):
+    """Publish a verification status and wake the request waiting on it."""
+    with _verification_lock(verification_id):
+        _verification_results[verification_id] = result
+    pending = _verification_pending.get(verification_id)
+    status = result.get("status")
+    if pending is not None and status != "pending":
+        pending["status_event"].set()
+        if status in ("success", "error"):
+            pending["terminal_event"].set()
+
+
 def _set_challenge_code(verification_id: str, code: str):
-    with _verification_lock:
-        if verification_id in _verification_pending:
-            _verification_pending[verification_id]["code"] = code
-            _verification_pending[verification_id]["event"].set()
+    pending = _verification_pending.get(verification_id)
+    if pending is not None:
+        pending["code"] = code
+        pending["event"].set()
+
+
+def _client_settings(client) -> dict:
+    """instagrapi client settings, in memory when get_settings() exists, else via a dump_settings temp file."""
+    if hasattr(client, "get_settings"):
+        return client.get_settings()
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        client.dump_settings(path)
+        with open(path, "rb") as f:
+            return jsonio.loads(f.read())
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
 
 
 def _run_verify_login(verification_id: str, username: str, password: str, proxy: Optional[str]):
     """Run in background thread: login via InstagramLoginHelper (session -> sessionid -> username/password + 2FA)."""
     try:
-        with _verification_lock:
-            _verification_results[verification_id] = {"status": "pending"}
+        _set_verification_result(verification_id, {"status": "pending"})
 
         def challenge_callback(u: str, method: str) -> str:
             pending = _get_or_create_pending(verification_id)
-            with _verification_lock:
-                _verification_results[verification_id]["status"] = "need_2fa"
+            _set_verification_result(verification_id, {"status": "need_2fa"})
             pending["event"].wait(timeout=300)
             return pending.get("code") or ""
 
@@ -159,75 +277,63 @@ def _run_verify_login(verification_id: str, username: str, password: str, proxy:
             challenge_code_callback=challenge_callback,
         )
         if not helper.login():
-            with _verification_lock:
-                _verification_results[verification_id] = {"status": "error", "error": "Login failed"}
+            _set_verification_result(verification_id, {"status": "error", "error": "Login failed"})
             return
 
         # Success: extract session (sessionid, ds_user_id) from helper.client
         try:
-            fd, path = tempfile.mkstemp(suffix=".json")
-            os.close(fd)
-            try:
-                helper.client.dump_settings(path)
-                with open(path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                auth = data.get("authorization_data") or {}
-                sessionid = auth.get("sessionid", "")
-                ds_user_id = auth.get("ds_user_id", "")
-                if not sessionid and data.get("cookies"):
-                    sessionid = data["cookies"].get("sessionid", "")
-                if not ds_user_id and data.get("cookies"):
-                    ds_user_id = data["cookies"].get("ds_user_id", "")
-                session_cookies = json.dumps({"sessionid": sessionid, "ds_user_id": ds_user_id})
-                with _verification_lock:
-                    _verification_results[verification_id] = {
-                        "status": "success",
-                        "session_cookies": session_cookies,
-                    }
-            finally:
-                try:
-                    os.unlink(path)
-                except OSError:
-                    pass
+            data = _client_settings(helper.client)
+            auth = data.get("authorization_data") or {}
+            sessionid = auth.get("sessionid", "")
+            ds_user_id = auth.get("ds_user_id", "")
+            if not sessionid and data.get("cookies"):
+                sessionid = data["cookies"].get("sessionid", "")
+            if not ds_user_id and data.get("cookies"):
+                ds_user_id = data["cookies"].get("ds_user_id", "")
+            session_cookies = jsonio.dumps({"sessionid": sessionid, "ds_user_id": ds_user_id}).decode()
+            _set_verification_result(verification_id, {
+                "status": "success",
+                "session_cookies": session_cookies,
+            })
         except Exception as e:
-            with _verification_lock:
-                _verification_results[verification_id] = {"status": "error", "error": f"Failed to save session: {e}"}
+            _set_verification_result(verification_id, {"status": "error", "error": f"Failed to save session: {e}"})
     except Exception as e:
-        with _verification_lock:
-            _verification_results[verification_id] = {"status": "error", "error": str(e)}
+        _set_verification_result(verification_id, {"status": "error", "error": str(e)})
     finally:
-        with _verification_lock:
-            _verification_pending.pop(verification_id, None)
+        _verification_pending.pop(verification_id, None)
 
 
 @router.get("")
-async def get_accounts():
-    """Get all accounts (without passwords)"""
+async def get_accounts(offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
+    """Get accounts (without passwords). Optional offset/limit return one page; total is the full count."""
+    stop = offset + limit if limit is not None else None
     if STORAGE_MODE == "supabase" and db_service:
         accounts = db_service.get_accounts()
-        return {"accounts": accounts}
+        total = len(accounts)
+        if offset or stop is not None:
+            accounts = dict(itertools.islice(accounts.items(), offset, stop))
+        return {"accounts": accounts, "total": total}
     else:
         # Legacy JSON implementation
-        accounts = load_accounts()
-        if not isinstance(accounts, dict):
-            accounts = {}
+        accounts = await _get_accounts_mem()
+        # Project only the requested page
         result = {}
-        for username, data in accounts.items():
+        for username, data in itertools.islice(accounts.items(), offset, stop):
             result[username] = {
                 "username": username,
                 "account_name": data.get("account_name", username),
                 "created_at": data.get("created_at")
             }
-        return {"accounts": result}
+        return {"accounts": result, "total": len(accounts)}
 
 @router.post("")
-async def create_account(account_data: dict):
+async def create_account(body: CreateAccountIn):
     """Create a new account"""
-    username = account_data.get("username")
-    password = account_data.get("password", "")
-    account_name = account_data.get("account_name", username)
-    proxy = account_data.get("proxy", "")
-    session_cookies = account_data.get("session_cookies", "")
+    username = body.username or ""
+    password = body.password or ""
+    account_name = body.account_name or username
+    proxy = body.proxy or ""
+    session_cookies = body.session_cookies or ""
     
     if not username:
         raise HTTPException(status_code=400, detail="Username is required")
@@ -239,7 +345,7 @@ async def create_account(account_data: dict):
     # Validate session cookies JSON if provided
     if session_cookies:
         try:
-            json.loads(session_cookies)
+            jsonio.loads(session_cookies)
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Session cookies must be valid JSON")
     
@@ -258,43 +364,31 @@ async def create_account(account_data: dict):
         }
     else:
         # Legacy JSON implementation
-        accounts = load_accounts()
-        
-        # Encrypt password if provided
-        key = get_or_create_key()
-        fernet = Fernet(key)
-        
-        encrypted_password = None
-        if password:
-            encrypted_password = fernet.encrypt(password.encode())
-        
-        # Encrypt session cookies if provided
-        encrypted_session_cookies = None
-        if session_cookies:
-            encrypted_session_cookies = fernet.encrypt(session_cookies.encode())
-        
-        accounts[username] = {
+        account = {
             "account_name": account_name or username,
             "created_at": datetime.now().timestamp()
         }
         
-        if encrypted_password:
-            accounts[username]["password"] = base64.b64encode(encrypted_password).decode()
+        # Encrypt password and session cookies if provided
+        if password:
+            account["password"] = encrypt_field(password)
         
-        if encrypted_session_cookies:
-            accounts[username]["session_cookies"] = base64.b64encode(encrypted_session_cookies).decode()
+        if session_cookies:
+            account["session_cookies"] = encrypt_field(session_cookies)
         
         if proxy:
             # Encrypt proxy as well for security
-            encrypted_proxy = fernet.encrypt(proxy.encode())
-            accounts[username]["proxy"] = base64.b64encode(encrypted_proxy).decode()
+            account["proxy"] = encrypt_field(proxy)
         
-        save_accounts(accounts)
+        async with _accounts_file_lock:
+            accounts = await _get_accounts_mem()
+            accounts[username] = account
+            _mark_accounts_dirty()
         
         return {
             "username": username,
             "account_name": account_name,
-            "created_at": accounts[username]["created_at"]
+            "created_at": account["created_at"]
         }
 
 
@@ -303,118 +397,178 @@ async def import_accounts(file: UploadFile = File(...)):
     """Bulk import accounts from a CSV file. Columns: username (required), password, account_name, sessionid, proxy. Either password or sessionid required per row."""
     if not file.filename or not file.filename.lower().endswith((".csv", ".txt")):
         raise HTTPException(status_code=400, detail="Upload a CSV or TXT file")
-    content = await file.read()
+    # Decode the spooled upload as a stream (utf-8-sig drops a BOM) instead of reading it whole;
+    # newline="" leaves line splitting to csv, so U+2028 and friends stay inside their field
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
     try:
-        text = content.decode("utf-8")
+        return await _import_csv(csv.reader(text))
+    finally:
+        text.detach()  # leave the upload file open
+
+
+async def _import_csv(reader) -> dict:
+    """Resolve the header columns and import the remaining rows."""
+    try:
+        header = await asyncio.to_thread(next, reader, None)
     except UnicodeDecodeError:
-        try:
-            text = content.decode("utf-8-sig")
-        except Exception:
-            raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
-    reader = csv.DictReader(io.StringIO(text))
-    if not reader.fieldnames:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    if not header:
         raise HTTPException(status_code=400, detail="CSV has no header row")
-    # Normalize column names (case-insensitive)
-    col_map = {f.strip().lower(): f for f in reader.fieldnames}
-    def get_col(row: dict, *names: str) -> str:
-        for n in names:
-            key = col_map.get(n.strip().lower())
-            if key is not None:
-                return (row.get(key) or "").strip()
-        return ""
+    # Normalize column names (case-insensitive) and resolve each field's column index once;
+    # rows are then read positionally without building a dict per row
+    col_index = {}
+    for idx, name in enumerate(header):
+        col_index.setdefault(name.strip().casefold(), idx)
+    columns = {
+        field: next((col_index[n] for n in aliases if n in col_index), None)
+        for field, aliases in IMPORT_COLUMN_ALIASES.items()
+    }
+    try:
+        if STORAGE_MODE == "supabase" and db_service:
+            imported, errors = await _import_in_batches(reader, columns, None)
+        else:
+            # Rows are merged in worker threads, so stage them apart from the shared dict
+            staged: Dict = {}
+            imported, errors = await _import_in_batches(reader, columns, staged)
+            async with _accounts_file_lock:
+                accounts = await _get_accounts_mem()
+                accounts.update(staged)
+                _mark_accounts_dirty()
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    return {"imported": imported, "errors": errors}
+
+
+async def _import_in_batches(reader, columns: Dict[str, Optional[int]], accounts_dict: Optional[Dict]) -> Tuple[int, List[dict]]:
+    """Run _import_rows over the reader IMPORT_BATCH_SIZE rows at a time in a worker thread."""
     imported = 0
     errors: List[dict] = []
-    accounts_dict = load_accounts() if STORAGE_MODE != "supabase" or not db_service else None
-    for i, row in enumerate(reader):
-        username = get_col(row, "username", "user", "instagram", "handle")
-        password = get_col(row, "password", "pass")
-        account_name = get_col(row, "account_name", "display_name", "name")
-        sessionid = get_col(row, "sessionid", "session_id", "session")
-        proxy = get_col(row, "proxy")
-        session_cookies = json.dumps({"sessionid": sessionid}) if sessionid else ""
+    first_row = 0
+    while True:
+        try:
+            n, batch_imported, batch_errors = await asyncio.to_thread(
+                _import_rows, reader, columns, accounts_dict, first_row
+            )
+        except UnicodeDecodeError:
+            if accounts_dict is not None:
+                raise  # JSON mode: nothing saved yet, reject the whole file
+            # Supabase rows from earlier batches already exist: report them and where the import stopped
+            errors.append({"row": first_row + 2, "username": "", "error": "File must be UTF-8 encoded; import stopped at this row"})
+            return imported, errors
+        imported += batch_imported
+        errors.extend(batch_errors)
+        first_row += n
+        if n < IMPORT_BATCH_SIZE:
+            return imported, errors
+
+
+def _import_rows(reader, columns: Dict[str, Optional[int]], accounts_dict: Optional[Dict], first_row: int) -> Tuple[int, int, List[dict]]:
+    """Create an account for each of the next IMPORT_BATCH_SIZE CSV rows, into accounts_dict (JSON mode, caller saves) or Supabase when None. Returns (rows_read, imported, errors)."""
+    batch = list(itertools.islice(reader, IMPORT_BATCH_SIZE))
+    imported = 0
+    errors: List[dict] = []
+    parsed: List[tuple] = []
+    # Skip blank lines, keeping each row's index for error reporting
+    numbered = [(i, row) for i, row in enumerate(batch, start=first_row) if row]
+    rows = [row for _, row in numbered]
+
+    def column(idx: Optional[int]):
+        """Stripped values of one column across the batch (one C-level map per column)"""
+        if idx is None:
+            return itertools.repeat("", len(rows))
+        return map(str.strip, [row[idx] if idx < len(row) else "" for row in rows])
+
+    cells = zip(
+        (i for i, _ in numbered),
+        column(columns["username"]),
+        column(columns["password"]),
+        column(columns["account_name"]),
+        column(columns["sessionid"]),
+        column(columns["proxy"]),
+    )
+    for i, username, password, account_name, sessionid, proxy in cells:
+        session_cookies = jsonio.dumps({"sessionid": sessionid}).decode() if sessionid else ""
         if not username:
             errors.append({"row": i + 2, "username": username or "(empty)", "error": "Username is required"})
             continue
-        if STORAGE_MODE == "supabase" and db_service:
-            ok, err = _create_one_account(username, password, account_name or username, proxy, session_cookies)
-        else:
-            ok, err = _create_one_account(
-                username, password, account_name or username, proxy, session_cookies, accounts_dict=accounts_dict
-            )
+        parsed.append((i, username, password, account_name or username, proxy, session_cookies))
+    if accounts_dict is None:
+        results = [(_create_one_account(*fields[1:]), None) for fields in parsed]
+    else:
+        # JSON mode is CPU-bound on encryption (which releases the GIL): build each record
+        # in the pool, then merge in row order so later duplicates still win
+        results = list(_import_pool.map(_build_import_record, parsed))
+    for fields, ((ok, err), record) in zip(parsed, results):
         if ok:
+            if record:
+                accounts_dict.update(record)
             imported += 1
         else:
-            errors.append({"row": i + 2, "username": username, "error": err or "Unknown error"})
-    if accounts_dict is not None:
-        save_accounts(accounts_dict)
-    return {"imported": imported, "errors": errors}
+            errors.append({"row": fields[0] + 2, "username": fields[1], "error": err or "Unknown error"})
+    return len(batch), imported, errors
+
+
+def _build_import_record(fields: tuple) -> Tuple[Tuple[bool, Optional[str]], Dict]:
+    """Run _create_one_account for one parsed import row into a fresh dict (thread pool worker)."""
+    record: Dict = {}
+    return _create_one_account(*fields[1:], accounts_dict=record), record
 
 
 @router.post("/verify-login")
-async def verify_login(payload: dict):
+async def verify_login(body: VerifyLoginIn):
     """Start login verification (username/password). Returns need_2fa + verification_id, or success/session_cookies, or error."""
-    username = payload.get("username", "").strip()
-    password = payload.get("password", "")
-    proxy = (payload.get("proxy") or "").strip() or None
+    username = (body.username or "").strip()
+    password = body.password or ""
+    proxy = (body.proxy or "").strip() or None
     if not username or not password:
         raise HTTPException(status_code=400, detail="Username and password are required for verification")
     verification_id = str(uuid.uuid4())
-    with _verification_lock:
-        _verification_results[verification_id] = {"status": "pending"}
-    thread = threading.Thread(
-        target=_run_verify_login,
-        args=(verification_id, username, password, proxy),
-        daemon=True,
-    )
-    thread.start()
-    # Poll for up to 20s for initial outcome (success, error, or need_2fa)
-    for _ in range(100):
-        time.sleep(0.2)
-        with _verification_lock:
-            r = _verification_results.get(verification_id, {})
-        status = r.get("status", "pending")
-        if status == "need_2fa":
-            return {"need_2fa": True, "verification_id": verification_id, "username": username}
-        if status == "success":
-            return {
-                "success": True,
-                "session_cookies": r.get("session_cookies"),
-            }
-        if status == "error":
-            return {"success": False, "error": r.get("error", "Login failed")}
+    pending = _get_or_create_pending(verification_id)
+    _verification_results[verification_id] = {"status": "pending"}
+    _verify_pool.submit(_run_verify_login, verification_id, username, password, proxy)
+    # Wait up to 20s for initial outcome (success, error, or need_2fa) without blocking the event loop
+    await asyncio.to_thread(pending["status_event"].wait, 20.0)
+    r = _verification_results.get(verification_id, {})
+    status = r.get("status", "pending")
+    if status == "need_2fa":
+        return {"need_2fa": True, "verification_id": verification_id, "username": username}
+    if status == "success":
+        return {
+            "success": True,
+            "session_cookies": r.get("session_cookies"),
+        }
+    if status == "error":
+        return {"success": False, "error": r.get("error", "Login failed")}
     # Timeout: assume 2FA will be required
-    with _verification_lock:
+    with _verification_lock(verification_id):
         if _verification_results.get(verification_id, {}).get("status") == "pending":
-            _verification_results[verification_id]["status"] = "need_2fa"
+            _verification_results[verification_id] = {"status": "need_2fa"}
     return {"need_2fa": True, "verification_id": verification_id, "username": username}
 
 
 @router.post("/verify-login/challenge-code")
-async def verify_login_challenge_code(payload: dict):
+async def verify_login_challenge_code(body: ChallengeCodeIn):
     """Submit 2FA code for account verification. Returns success + session_cookies or error."""
-    verification_id = payload.get("verification_id")
-    code = (payload.get("code") or "").strip()
+    verification_id = body.verification_id
+    code = (body.code or "").strip()
     if not verification_id or not code:
         raise HTTPException(status_code=400, detail="verification_id and code are required")
+    pending = _verification_pending.get(verification_id)
     _set_challenge_code(verification_id, code)
-    # Wait for thread to finish (up to 120s)
-    for _ in range(240):
-        time.sleep(0.5)
-        with _verification_lock:
-            r = _verification_results.get(verification_id, {})
-        status = r.get("status", "pending")
-        if status == "success":
-            session_cookies = r.get("session_cookies")
-            with _verification_lock:
-                _verification_results.pop(verification_id, None)
-            return {"success": True, "session_cookies": session_cookies}
-        if status == "error":
-            err = r.get("error", "Verification failed")
-            with _verification_lock:
-                _verification_results.pop(verification_id, None)
-            return {"success": False, "error": err}
-    with _verification_lock:
+    # Wait for thread to finish (up to 120s); if it already has, its result is final
+    if pending is not None:
+        await asyncio.to_thread(pending["terminal_event"].wait, 120.0)
+    r = _verification_results.get(verification_id, {})
+    status = r.get("status", "pending")
+    if status == "success":
+        session_cookies = r.get("session_cookies")
+        _verification_results.pop(verification_id, None)
+        return {"success": True, "session_cookies": session_cookies}
+    if status == "error":
+        err = r.get("error", "Verification failed")
         _verification_results.pop(verification_id, None)
+        return {"success": False, "error": err}
+    _verification_results.pop(verification_id, None)
     return {"success": False, "error": "Verification timed out"}
 
 
@@ -428,10 +582,11 @@ async def delete_account(username: str):
         return {"message": "Account deleted successfully"}
     else:
         # Legacy JSON implementation
-        accounts = load_accounts()
-        if username not in accounts:
-            raise HTTPException(status_code=404, detail="Account not found")
-        
-        del accounts[username]
-        save_accounts(accounts)
+        async with _accounts_file_lock:
+            accounts = await _get_accounts_mem()
+            if username not in accounts:
+                raise HTTPException(status_code=404, detail="Account not found")
+            
+            del accounts[username]
+            _mark_accounts_dirty()
         return {"message": "Account deleted successfully"}
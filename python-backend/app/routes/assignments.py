@@ -1,10 +1,19 @@
 from fastapi import APIRouter, HTTPException
-import json
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
+import asyncio
 import os
+import threading
 
+from .. import jsonio
 from ..config import ASSIGNMENTS_FILE, STORAGE_MODE
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse if jsonio.ORJSON_AVAILABLE else JSONResponse)
+
+
+class AssignIn(BaseModel):
+    username: str = ""
+    campaign_id: str = ""
 
 # Initialize database service if using Supabase
 db_service = None
@@ -18,19 +27,67 @@ if STORAGE_MODE == "supabase":
         print("Falling back to JSON storage")
 
 
+# JSON mode: handlers work on an in-memory copy of ASSIGNMENTS_FILE and mark it dirty;
+# flush_assignments (run periodically by main) writes changes out in one go
+_assignments_file_lock = asyncio.Lock()
+_assignments_mem = None
+_assignments_dirty = False
+
+
+# Parsed ASSIGNMENTS_FILE keyed by its st_mtime_ns; callers get a shallow copy they may modify
+_assignments_cache = None
+_assignments_cache_lock = threading.Lock()
+
+
 def load_assignments():
-    if not os.path.exists(ASSIGNMENTS_FILE):
+    global _assignments_cache
+    try:
+        mtime_ns = os.stat(ASSIGNMENTS_FILE).st_mtime_ns
+    except OSError:
         return {}
+    with _assignments_cache_lock:
+        if _assignments_cache is not None and _assignments_cache[0] == mtime_ns:
+            return dict(_assignments_cache[1])
     try:
-        with open(ASSIGNMENTS_FILE, "r", encoding='utf-8') as f:
-            return json.load(f)
+        with open(ASSIGNMENTS_FILE, "rb") as f:
+            data = jsonio.loads(f.read())
     except Exception:
         return {}
+    with _assignments_cache_lock:
+        _assignments_cache = (mtime_ns, data)
+    return dict(data)
 
 
 def save_assignments(data: dict):
-    with open(ASSIGNMENTS_FILE, "w", encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+    global _assignments_cache
+    # Write to a temp file and swap it in so readers never see a partial file
+    tmp = ASSIGNMENTS_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(jsonio.dumps(data, indent=True))
+    with _assignments_cache_lock:
+        os.replace(tmp, ASSIGNMENTS_FILE)
+        _assignments_cache = (os.stat(ASSIGNMENTS_FILE).st_mtime_ns, dict(data))
+
+
+async def _get_assignments_mem() -> dict:
+    global _assignments_mem
+    if _assignments_mem is None:
+        _assignments_mem = await asyncio.to_thread(load_assignments)
+    return _assignments_mem
+
+
+async def flush_assignments():
+    """Write the in-memory assignments to ASSIGNMENTS_FILE if they changed since the last flush"""
+    global _assignments_dirty
+    async with _assignments_file_lock:
+        if not _assignments_dirty:
+            return
+        _assignments_dirty = False
+        try:
+            await asyncio.to_thread(save_assignments, _assignments_mem)
+        except Exception:
+            _assignments_dirty = True
+            raise
 
 
 @router.get("")
@@ -39,13 +96,14 @@ async def get_assignments():
         assignments = db_service.get_assignments()
         return {"assignments": assignments}
     else:
-        return {"assignments": load_assignments()}
+        return {"assignments": dict(await _get_assignments_mem())}
 
 
 @router.post("")
-async def assign(data: dict):
-    username = data.get("username")
-    campaign_id = data.get("campaign_id")
+async def assign(body: AssignIn):
+    global _assignments_dirty
+    username = body.username
+    campaign_id = body.campaign_id
     if not username or not campaign_id:
         raise HTTPException(status_code=400, detail="username and campaign_id required")
     
@@ -54,14 +112,16 @@ async def assign(data: dict):
         assignments = db_service.get_assignments()
         return {"assignments": assignments}
     else:
-        assignments = load_assignments()
-        assignments[username] = campaign_id
-        save_assignments(assignments)
-        return {"assignments": assignments}
+        async with _assignments_file_lock:
+            assignments = await _get_assignments_mem()
+            assignments[username] = campaign_id
+            _assignments_dirty = True
+            return {"assignments": dict(assignments)}
 
 
 @router.delete("/{username}")
 async def unassign(username: str):
+    global _assignments_dirty
     if STORAGE_MODE == "supabase" and db_service:
         deleted = db_service.delete_assignment(username)
         if not deleted:
@@ -69,9 +129,10 @@ async def unassign(username: str):
         assignments = db_service.get_assignments()
         return {"assignments": assignments}
     else:
-        assignments = load_assignments()
-        if username not in assignments:
-            raise HTTPException(status_code=404, detail="Assignment not found")
-        del assignments[username]
-        save_assignments(assignments)
-        return {"assignments": assignments}
+        async with _assignments_file_lock:
+            assignments = await _get_assignments_mem()
+            if username not in assignments:
+                raise HTTPException(status_code=404, detail="Assignment not found")
+            del assignments[username]
+            _assignments_dirty = True
+            return {"assignments": dict(assignments)}
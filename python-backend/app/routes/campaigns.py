@@ -1,11 +1,15 @@
+import asyncio
+import codecs
+import copy
 import csv
 import io
+import itertools
 from fastapi import APIRouter, HTTPException, UploadFile, File
-from typing import List, Dict, Optional
-import json
+from typing import Callable, List, Dict, Optional
 import os
 from datetime import datetime
 
+from .. import jsonio
 from ..config import CAMPAIGNS_FILE, STORAGE_MODE, LEADS_DIR
 
 router = APIRouter()
@@ -21,20 +25,49 @@ if STORAGE_MODE == "supabase":
         print(f"Warning: Could not initialize Supabase: {e}")
         print("Falling back to JSON storage")
 
-def load_campaigns() -> Dict:
-    """Load campaigns from JSON file"""
-    if not os.path.exists(CAMPAIGNS_FILE):
-        return {}
+# Parsed CAMPAIGNS_FILE keyed by its st_mtime_ns
+_campaigns_cache = {"mtime": -1, "data": None}
+# Serializes load-modify-save in the JSON handlers now that the save runs off the event loop
+_campaigns_lock = asyncio.Lock()
+
+
+def load_campaigns(for_update: bool = False) -> Dict:
+    """Load campaigns from JSON file (re-read only when the file has changed).
+    The cached dict is shared: pass for_update=True to get a private copy to modify and save."""
     try:
-        with open(CAMPAIGNS_FILE, "r", encoding='utf-8') as f:
-            return json.load(f)
-    except:
+        mtime_ns = os.stat(CAMPAIGNS_FILE).st_mtime_ns
+    except OSError:
         return {}
+    if _campaigns_cache["mtime"] != mtime_ns:
+        try:
+            with open(CAMPAIGNS_FILE, "rb") as f:
+                data = jsonio.loads(f.read())
+        except:
+            return {}
+        _campaigns_cache["mtime"], _campaigns_cache["data"] = mtime_ns, data
+    data = _campaigns_cache["data"]
+    return copy.deepcopy(data) if for_update else data
+
+def save_campaigns(campaigns: Dict, indent: bool = True):
+    """Save campaigns to JSON file (written to a temp file, then swapped in atomically).
+    Frequent background rewrites pass indent=False to skip pretty-printing."""
+    tmp = CAMPAIGNS_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(jsonio.dumps(campaigns, indent=indent))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, CAMPAIGNS_FILE)
+    # May run in a worker thread: publish data before mtime so a concurrent reader never
+    # pairs the new mtime with the old data
+    _campaigns_cache["data"] = campaigns
+    _campaigns_cache["mtime"] = os.stat(CAMPAIGNS_FILE).st_mtime_ns
 
-def save_campaigns(campaigns: Dict):
-    """Save campaigns to JSON file"""
-    with open(CAMPAIGNS_FILE, "w", encoding='utf-8') as f:
-        json.dump(campaigns, f, indent=2)
+async def update_campaigns(modify: Callable[[Dict], bool], indent: bool = True):
+    """Run modify on a private copy of all campaigns under the write lock; saves when it returns True."""
+    async with _campaigns_lock:
+        campaigns = load_campaigns(for_update=True)
+        if modify(campaigns):
+            await asyncio.to_thread(save_campaigns, campaigns, indent)
 
 @router.get("")
 async def get_campaigns():
@@ -60,19 +93,26 @@ async def get_campaign(campaign_id: str):
             raise HTTPException(status_code=404, detail="Campaign not found")
         return campaigns[campaign_id]
 
+REQUIRED_CAMPAIGN_FIELDS = ("name", "followers_threshold", "message_count", "message_templates")
+VALID_DELAY_UNITS = frozenset(("minutes", "hours", "days"))
+DEFAULT_DELAY_UNIT = "hours"
+
+
 @router.post("")
 async def create_campaign(campaign_data: dict):
     """Create a new campaign"""
+    # One clock read per request for the ID and both timestamps
+    now = datetime.now()
+    stamp = now.isoformat()
     # Generate campaign ID
-    campaign_id = campaign_data.get("id") or f"campaign_{int(datetime.now().timestamp())}"
+    campaign_id = campaign_data.get("id") or f"campaign_{int(now.timestamp())}"
     target_mode = campaign_data.get("target_mode", 0)
     # target_input optional when target_mode is 3 (CSV leads)
-    required_fields = ["name", "followers_threshold", "message_count", "message_templates"]
-    if target_mode != 3:
-        required_fields.append("target_input")
-    for field in required_fields:
-        if field not in campaign_data:
-            raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
+    required_fields = REQUIRED_CAMPAIGN_FIELDS if target_mode == 3 else REQUIRED_CAMPAIGN_FIELDS + ("target_input",)
+    missing = set(required_fields).difference(campaign_data.keys())
+    if missing:
+        field = next(f for f in required_fields if f in missing)
+        raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
     
     # Validate follow_ups (optional, up to 10)
     follow_ups_raw = campaign_data.get("follow_ups") or []
@@ -80,16 +120,17 @@ async def create_campaign(campaign_data: dict):
     for fu in (follow_ups_raw[:10] if isinstance(follow_ups_raw, list) else []):
         if not isinstance(fu, dict):
             continue
-        msg = (fu.get("message") or "").strip()
+        fu_get = fu.get
+        msg = (fu_get("message") or "").strip()
         if not msg:
             continue
         try:
-            delay_value = max(0, int(fu.get("delay_value", 0)))
+            delay_value = max(0, int(fu_get("delay_value", 0)))
         except (TypeError, ValueError):
             delay_value = 0
-        unit = (fu.get("delay_unit") or "hours").lower()
-        if unit not in ("minutes", "hours", "days"):
-            unit = "hours"
+        unit = (fu_get("delay_unit") or DEFAULT_DELAY_UNIT).lower()
+        if unit not in VALID_DELAY_UNITS:
+            unit = DEFAULT_DELAY_UNIT
         follow_ups.append({"message": msg, "delay_value": delay_value, "delay_unit": unit})
 
     campaign = {
@@ -106,8 +147,8 @@ async def create_campaign(campaign_data: dict):
         "follow_ups": follow_ups,
         "webhook_url": campaign_data.get("webhook_url", ""),
         "status": "draft",
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat(),
+        "created_at": stamp,
+        "updated_at": stamp,
         "lead_count": campaign_data.get("lead_count", 0),
     }
     mapping = campaign_data.get("csv_column_mapping")
@@ -122,9 +163,10 @@ async def create_campaign(campaign_data: dict):
         return {"id": campaign_id, **created}
     else:
         # Legacy JSON implementation
-        campaigns = load_campaigns()
-        campaigns[campaign_id] = campaign
-        save_campaigns(campaigns)
+        async with _campaigns_lock:
+            campaigns = load_campaigns(for_update=True)
+            campaigns[campaign_id] = campaign
+            await asyncio.to_thread(save_campaigns, campaigns)
         return {"id": campaign_id, **campaign}
 
 @router.put("/{campaign_id}")
@@ -137,50 +179,86 @@ async def update_campaign(campaign_id: str, campaign_data: dict):
         return updated
     else:
         # Legacy JSON implementation
-        campaigns = load_campaigns()
-        if campaign_id not in campaigns:
-            raise HTTPException(status_code=404, detail="Campaign not found")
-        
-        # Update fields
-        campaigns[campaign_id].update(campaign_data)
-        campaigns[campaign_id]["updated_at"] = datetime.now().isoformat()
-        # Ensure webhook_url is saved
-        if "webhook_url" in campaign_data:
-            campaigns[campaign_id]["webhook_url"] = campaign_data["webhook_url"]
-        
-        save_campaigns(campaigns)
+        async with _campaigns_lock:
+            campaigns = load_campaigns(for_update=True)
+            if campaign_id not in campaigns:
+                raise HTTPException(status_code=404, detail="Campaign not found")
+            
+            # Update fields
+            campaigns[campaign_id].update(campaign_data)
+            campaigns[campaign_id]["updated_at"] = datetime.now().isoformat()
+            # Ensure webhook_url is saved
+            if "webhook_url" in campaign_data:
+                campaigns[campaign_id]["webhook_url"] = campaign_data["webhook_url"]
+            
+            await asyncio.to_thread(save_campaigns, campaigns)
         return campaigns[campaign_id]
 
-def _parse_csv_leads(content: bytes) -> List[str]:
-    """Parse CSV or plain text (one username per line). Returns deduplicated list of usernames."""
-    text = content.decode("utf-8", errors="replace")
+LEAD_HEADER_NAMES = ("username", "instagram", "handle", "user", "insta")
+# Head of an upload checked for CSV delimiters before taking the plain-list path
+PLAIN_LEADS_SNIFF_BYTES = 64 * 1024
+
+
+def _iter_upload_lines(f):
+    """Lines of a seekable binary upload from the start, decoded as UTF-8 (BOM dropped, bad bytes replaced)."""
+    f.seek(0)
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        yield from text
+    finally:
+        text.detach()  # leave the upload file open
+
+
+def _parse_plain_leads(f) -> Optional[List[str]]:
+    """Fast path for a plain one-username-per-line upload: split and dedupe without the csv module.
+    Returns None when the file has commas or quotes (or yields nothing) and needs the full parser."""
+    f.seek(0)
+    head = f.read(PLAIN_LEADS_SNIFF_BYTES)
+    if b"," in head or b'"' in head:
+        return None
+    content = head + f.read()
+    if b"," in content or b'"' in content:
+        return None
+    if content.startswith(codecs.BOM_UTF8):
+        content = content[len(codecs.BOM_UTF8):]
+    # Dedupe the raw lines as bytes and decode only the unique ones
+    seen = {ln for ln in (raw.strip() for raw in content.splitlines()) if ln and not ln.startswith(b"#")}
+    usernames = {ln.decode("utf-8", errors="replace").strip() for ln in seen}
+    usernames = [u for u in usernames if u and u.lower() not in LEAD_HEADER_NAMES]
+    if not usernames:
+        return None
+    usernames.sort()
+    return usernames
+
+
+def _parse_csv_leads(f) -> List[str]:
+    """Parse CSV or plain text (one username per line) from a binary upload file. Returns deduplicated list of usernames."""
+    plain = _parse_plain_leads(f)
+    if plain is not None:
+        return plain
     usernames = set()
-    # Try CSV: column named username/instagram/handle or first column
+    # Try CSV: column named username/instagram/handle or first column; rows are streamed
+    # straight into the set rather than collected into a list first
     try:
-        reader = csv.reader(io.StringIO(text))
-        rows = list(reader)
-        if not rows:
+        reader = csv.reader(_iter_upload_lines(f))
+        header_row = next(reader, None)
+        if header_row is None:
             return []
-        header = [h.strip().lower() for h in rows[0]]
-        username_col = None
-        for name in ("username", "instagram", "handle", "user", "insta"):
-            if name in header:
-                username_col = header.index(name)
-                break
-        start = 1 if username_col is not None else 0
-        for row in rows[start:]:
-            if username_col is not None and username_col < len(row):
-                u = row[username_col].strip()
-            else:
-                u = row[0].strip() if row else ""
-            if u and not u.startswith("#") and u.lower() not in ("username", "instagram", "handle", "user", "insta"):
+        header = [h.strip().lower() for h in header_row]
+        username_col = next((header.index(name) for name in LEAD_HEADER_NAMES if name in header), None)
+        # Without a recognised header the first row is data too
+        rows = reader if username_col is not None else itertools.chain((header_row,), reader)
+        col = username_col if username_col is not None else 0
+        for row in rows:
+            u = row[col].strip() if col < len(row) else ""
+            if u and not u.startswith("#") and u.lower() not in LEAD_HEADER_NAMES:
                 usernames.add(u)
         if usernames:
             return sorted(usernames)
     except Exception:
-        pass
-    # Plain text: one username per line or comma-separated
-    for line in text.splitlines():
+        usernames.clear()
+    # Plain text: one username per line or comma-separated (only when the CSV pass found nothing)
+    for line in _iter_upload_lines(f):
         for part in line.replace(",", " ").split():
             u = part.strip()
             if u and not u.startswith("#"):
@@ -188,46 +266,49 @@ def _parse_csv_leads(content: bytes) -> List[str]:
     return sorted(usernames)
 
 
-def _parse_csv_leads_with_mapping(
-    content: bytes, mapping: Dict[str, str]
-) -> List[Dict[str, str]]:
-    """Parse CSV with column mapping. Returns list of dicts with username, fullname?, firstname?."""
-    text = content.decode("utf-8", errors="replace")
+def _parse_csv_leads_with_mapping(f, mapping: Dict[str, str]) -> List[Dict[str, str]]:
+    """Parse CSV from a binary upload file with column mapping. Returns list of dicts with username, fullname?, firstname?."""
     username_col = (mapping.get("username") or "").strip()
     if not username_col:
         return []
     fullname_col = (mapping.get("fullname") or "").strip() or None
     firstname_col = (mapping.get("firstname") or "").strip() or None
     try:
-        reader = csv.DictReader(io.StringIO(text))
-        rows = list(reader)
-        if not rows:
+        # Positional csv.reader (C tokenizer) streamed row by row: no per-row dict, no row list
+        reader = csv.reader(_iter_upload_lines(f))
+        header = next(reader, None)
+        if not header:
             return []
-        # Match mapping column names to CSV header keys (case-insensitive)
-        header_lower = {k.strip().lower(): k for k in rows[0].keys()}
-        def key_for(col: Optional[str]):
+        # Match mapping column names to CSV header positions (case-insensitive)
+        header_index = {}
+        for i, name in enumerate(header):
+            header_index.setdefault(name.strip().lower(), i)
+        def index_for(col: Optional[str]) -> Optional[int]:
             if not (col or "").strip():
                 return None
-            return header_lower.get(col.strip().lower()) or (col if col in rows[0] else None)
-        username_key = key_for(username_col) or username_col
-        fullname_key = key_for(fullname_col) if fullname_col else None
-        firstname_key = key_for(firstname_col) if firstname_col else None
+            return header_index.get(col.strip().lower())
+        username_idx = index_for(username_col)
+        if username_idx is None:
+            return []
+        fullname_idx = index_for(fullname_col)
+        firstname_idx = index_for(firstname_col)
         seen = set()
         out = []
-        for row in rows:
-            u = (row.get(username_key) or "").strip()
-            if not u or u.startswith("#") or u.lower() in ("username", "instagram", "handle"):
+        for row in reader:
+            width = len(row)
+            u = row[username_idx].strip() if username_idx < width else ""
+            if not u or u.startswith("#"):
                 continue
             if u in seen:
                 continue
             seen.add(u)
             lead = {"username": u}
-            if fullname_key:
-                fn = (row.get(fullname_key) or "").strip()
+            if fullname_idx is not None and fullname_idx < width:
+                fn = row[fullname_idx].strip()
                 if fn:
                     lead["fullname"] = fn
-            if firstname_key:
-                fn = (row.get(firstname_key) or "").strip()
+            if firstname_idx is not None and firstname_idx < width:
+                fn = row[firstname_idx].strip()
                 if fn:
                     lead["firstname"] = fn
             out.append(lead)
@@ -236,6 +317,28 @@ def _parse_csv_leads_with_mapping(
         return []
 
 
+LEADS_WRITE_BUFFER = 1 << 20
+
+
+def _write_mapped_leads(leads: List[Dict[str, str]], jsonl_path: str, txt_path: str):
+    """Write leads as JSONL and their usernames as TXT in one pass over the list."""
+    with open(jsonl_path, "wb", buffering=LEADS_WRITE_BUFFER) as jf, \
+            open(txt_path, "wb", buffering=LEADS_WRITE_BUFFER) as tf:
+        for lead in leads:
+            jf.write(jsonio.dumps(lead) + b"\n")
+            tf.write(lead["username"].encode("utf-8") + b"\n")
+
+
+def _write_usernames(usernames: List[str], jsonl_path: str, txt_path: str):
+    """Write one username per line and drop any JSONL left from an earlier mapped upload."""
+    try:
+        os.remove(jsonl_path)
+    except OSError:
+        pass
+    with open(txt_path, "wb", buffering=LEADS_WRITE_BUFFER) as f:
+        f.write("".join(u + "\n" for u in usernames).encode("utf-8"))
+
+
 @router.post("/{campaign_id}/leads")
 async def upload_leads(campaign_id: str, file: UploadFile = File(...)):
     """Upload CSV (or plain text) leads. With csv_column_mapping stores JSONL (username + fullname/firstname); else one username per line."""
@@ -246,40 +349,31 @@ async def upload_leads(campaign_id: str, file: UploadFile = File(...)):
         campaign = campaigns.get(campaign_id) if campaigns else None
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
-    content = await file.read()
+    # The upload is already spooled (to disk when large); parse it as a stream in a worker thread
+    # instead of reading the whole file into memory. Writes run in a worker thread too, and the
+    # campaign's lead_count is only updated once they have finished
     mapping = campaign.get("csv_column_mapping") if isinstance(campaign.get("csv_column_mapping"), dict) else None
     os.makedirs(LEADS_DIR, exist_ok=True)
     txt_path = os.path.join(LEADS_DIR, f"{campaign_id}.txt")
     jsonl_path = os.path.join(LEADS_DIR, f"{campaign_id}.jsonl")
     if mapping and mapping.get("username"):
-        leads = _parse_csv_leads_with_mapping(content, mapping)
+        leads = await asyncio.to_thread(_parse_csv_leads_with_mapping, file.file, mapping)
         lead_count = len(leads)
-        with open(jsonl_path, "w", encoding="utf-8") as f:
-            for lead in leads:
-                f.write(json.dumps(lead, ensure_ascii=False) + "\n")
-        with open(txt_path, "w", encoding="utf-8") as f:
-            for lead in leads:
-                f.write(lead["username"] + "\n")
+        await asyncio.to_thread(_write_mapped_leads, leads, jsonl_path, txt_path)
     else:
-        usernames = _parse_csv_leads(content)
+        usernames = await asyncio.to_thread(_parse_csv_leads, file.file)
         lead_count = len(usernames)
-        if os.path.exists(jsonl_path):
-            try:
-                os.remove(jsonl_path)
-            except OSError:
-                pass
-        with open(txt_path, "w", encoding="utf-8") as f:
-            for u in usernames:
-                f.write(u + "\n")
+        await asyncio.to_thread(_write_usernames, usernames, jsonl_path, txt_path)
     update_data = {"lead_count": lead_count, "target_mode": 3}
     if STORAGE_MODE == "supabase" and db_service:
         db_service.update_campaign(campaign_id, update_data)
     else:
-        campaigns = load_campaigns()
-        if campaign_id in campaigns:
-            campaigns[campaign_id].update(update_data)
-            campaigns[campaign_id]["updated_at"] = datetime.now().isoformat()
-            save_campaigns(campaigns)
+        async with _campaigns_lock:
+            campaigns = load_campaigns(for_update=True)
+            if campaign_id in campaigns:
+                campaigns[campaign_id].update(update_data)
+                campaigns[campaign_id]["updated_at"] = datetime.now().isoformat()
+                await asyncio.to_thread(save_campaigns, campaigns)
     return {"campaign_id": campaign_id, "lead_count": lead_count}
 
 
@@ -293,12 +387,13 @@ async def delete_campaign(campaign_id: str):
         return {"message": "Campaign deleted successfully"}
     else:
         # Legacy JSON implementation
-        campaigns = load_campaigns()
-        if campaign_id not in campaigns:
-            raise HTTPException(status_code=404, detail="Campaign not found")
-        
-        del campaigns[campaign_id]
-        save_campaigns(campaigns)
+        async with _campaigns_lock:
+            campaigns = load_campaigns(for_update=True)
+            if campaign_id not in campaigns:
+                raise HTTPException(status_code=404, detail="Campaign not found")
+            
+            del campaigns[campaign_id]
+            await asyncio.to_thread(save_campaigns, campaigns)
         for ext in (".txt", ".jsonl"):
             leads_path = os.path.join(LEADS_DIR, f"{campaign_id}{ext}")
             if os.path.exists(leads_path):
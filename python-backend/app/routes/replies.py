@@ -1,12 +1,16 @@
 """Reply tracking API: list detected DM replies from replies.csv or Supabase."""
 import csv
+import io
+import mmap
 import os
+import re
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple
 
 from fastapi import APIRouter, Query
 
-from ..config import REPLIES_CSV, STORAGE_MODE
+from .. import jsonio
+from ..config import REPLIES_CSV, REPLIES_DAILY_COUNTS_FILE, STORAGE_MODE
 from ..reply_monitor import REPLIES_CSV_HEADER
 
 router = APIRouter()
@@ -32,6 +36,48 @@ def _parse_optional_datetime(s: Optional[str]):
         return None
 
 
+# Column positions in replies.csv rows
+_NUM_FIELDS = len(REPLIES_CSV_HEADER)
+_TS = REPLIES_CSV_HEADER.index("timestamp")
+_ACCOUNT = REPLIES_CSV_HEADER.index("account_username")
+_CAMPAIGN = REPLIES_CSV_HEADER.index("campaign_id")
+_TYPE = REPLIES_CSV_HEADER.index("message_type")
+
+
+# Parsed REPLIES_DAILY_COUNTS_FILE keyed by its st_mtime_ns
+_daily_counts_cache = {"mtime": -1, "data": None}
+
+
+def _daily_counts_index() -> Optional[dict]:
+    """Per-day {"reply", "inbound"} counts kept by the reply monitor, or None when the index
+    is missing or does not cover the current replies.csv (then callers scan the CSV)."""
+    try:
+        csv_size = os.path.getsize(REPLIES_CSV)
+        mtime_ns = os.stat(REPLIES_DAILY_COUNTS_FILE).st_mtime_ns
+    except OSError:
+        return None
+    if _daily_counts_cache["mtime"] != mtime_ns:
+        try:
+            with open(REPLIES_DAILY_COUNTS_FILE, "rb") as f:
+                data = jsonio.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        _daily_counts_cache["mtime"], _daily_counts_cache["data"] = mtime_ns, data
+    data = _daily_counts_cache["data"]
+    if not isinstance(data, dict) or data.get("csv_size") != csv_size:
+        return None
+    return data.get("days")
+
+
+def _whole_day_bounds(start_dt: datetime, end_dt: datetime) -> Optional[Tuple[str, str]]:
+    """(first_day, last_day) when [start_dt, end_dt] covers whole local days, else None."""
+    if start_dt.tzinfo is not None or end_dt.tzinfo is not None:
+        return None
+    if start_dt.time() != datetime.min.time() or (end_dt.hour, end_dt.minute, end_dt.second) != (23, 59, 59):
+        return None
+    return start_dt.date().isoformat(), end_dt.date().isoformat()
+
+
 def count_replies_and_inbounds_in_range(
     start: Optional[str] = None,
     end: Optional[str] = None,
@@ -47,29 +93,38 @@ def count_replies_and_inbounds_in_range(
         use_range = False
     if not use_range:
         today = datetime.now().date()
+    # O(days) from the per-day index when the window is whole days
+    bounds = _whole_day_bounds(start_dt, end_dt) if use_range else (today.isoformat(),) * 2
+    days = _daily_counts_index() if bounds else None
+    if bounds:
+        first_day, last_day = bounds
+    if days is not None:
+        replies_count = inbounds_count = 0
+        for day, counts in days.items():
+            if first_day <= day <= last_day:
+                replies_count += counts.get("reply", 0)
+                inbounds_count += counts.get("inbound", 0)
+        return replies_count, inbounds_count
     replies_count = 0
     inbounds_count = 0
     try:
         with open(REPLIES_CSV, "r", encoding="utf-8", newline="") as f:
-            reader = csv.DictReader(f, fieldnames=REPLIES_CSV_HEADER)
-            next(reader, None)  # skip header if present
-            for row in reader:
-                if row.get("timestamp") == "timestamp":
-                    continue
-                ts = row.get("timestamp") or ""
-                if not ts:
+            for row in csv.reader(f):
+                ts = row[_TS] if row else ""
+                if not ts or ts == "timestamp":
                     continue
-                try:
-                    dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-                    if use_range:
+                if bounds:
+                    # Whole days: the YYYY-MM-DD prefix decides, no parse needed
+                    if not first_day <= ts[:10] <= last_day:
+                        continue
+                else:
+                    try:
+                        dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
                         if dt < start_dt or dt > end_dt:
                             continue
-                    else:
-                        if dt.date() != today:
-                            continue
-                except ValueError:
-                    continue
-                msg_type = (row.get("message_type") or "").strip().lower()
+                    except (ValueError, TypeError):
+                        continue
+                msg_type = (row[_TYPE] if len(row) > _TYPE else "").strip().lower()
                 if msg_type == "inbound":
                     inbounds_count += 1
                 else:
@@ -90,25 +145,89 @@ def count_replies_for_today() -> int:
     return replies
 
 
-def _parse_replies_csv() -> list:
-    """Read replies.csv and return list of dicts (newest first)."""
+# Tail bytes of replies.csv read first by the list endpoint; grown 4x until enough rows match
+REPLIES_TAIL_WINDOW = 64 * 1024
+# Every replies.csv row starts on a new line with its ISO timestamp (lines inside a quoted
+# multi-line reply text almost never do), so this finds a row boundary in the middle of the file
+_ROW_START = re.compile(rb"\n(?=\d{4}-\d{2}-\d{2}T)")
+
+
+def _parse_replies_csv(window: Optional[int] = None) -> Tuple[list, bool]:
+    """Read replies.csv (only about the last `window` bytes when given). Returns (rows oldest first,
+    as lists padded to the header width; whether the start of the file was reached)."""
     if not os.path.isfile(REPLIES_CSV):
-        return []
+        return [], True
     rows = []
     try:
-        with open(REPLIES_CSV, "r", encoding="utf-8", newline="") as f:
-            reader = csv.DictReader(f, fieldnames=REPLIES_CSV_HEADER)
-            next(reader, None)  # skip header if present
-            for row in reader:
-                if row.get("timestamp") == "timestamp":
-                    continue
-                if len(row) >= len(REPLIES_CSV_HEADER) or row.get("timestamp"):
-                    rows.append(dict(row))
+        with open(REPLIES_CSV, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return [], True
+            offset = max(0, size - window) if window else 0
+            # Map the file and find the first row boundary in the window in place, so only the
+            # bytes from that row on are copied out
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = offset
+                if offset:
+                    m = _ROW_START.search(mm, offset)
+                    if m is None:
+                        return [], False
+                    start = m.end()
+                data = mm[start:size]
+        reader = csv.reader(io.StringIO(data.decode("utf-8", errors="replace"), newline=""))
+        for row in reader:
+            if not row or row[_TS] == "timestamp":
+                continue  # blank line or header
+            if len(row) < _NUM_FIELDS:
+                row.extend([None] * (_NUM_FIELDS - len(row)))
+            rows.append(row)
     except Exception:
-        return []
-    # Newest first
-    rows.reverse()
-    return rows
+        return [], True
+    return rows, offset == 0
+
+
+def _recent_replies_csv(limit: int, match: Optional[Callable[[list], bool]] = None) -> list:
+    """Newest-first replies.csv rows passing match (called with the positional row), at most limit,
+    as dicts. Reads the file from the end and only widens the window (up to the whole file) while
+    too few rows match."""
+    window = REPLIES_TAIL_WINDOW
+    while True:
+        rows, complete = _parse_replies_csv(window)
+        matched = []
+        for r in reversed(rows):
+            if match is None or match(r):
+                matched.append(r)
+                if len(matched) == limit:
+                    break
+        if len(matched) >= limit or complete:
+            return [dict(zip(REPLIES_CSV_HEADER, r)) for r in matched]
+        window *= 4
+
+
+def _at_or_after(ts: Optional[str], since_dt: datetime) -> bool:
+    """True if the row timestamp parses and is not before since_dt."""
+    if not ts:
+        return False
+    try:
+        return datetime.fromisoformat(ts.replace("Z", "+00:00")) >= since_dt
+    except (ValueError, TypeError):
+        return False
+
+
+def _since_predicate(since_dt: datetime) -> Callable[[Optional[str]], bool]:
+    """Row-timestamp test for ts >= since_dt. Naive ISO timestamps (what the reply monitor
+    writes) order the same as strings, so those compare without parsing; others are parsed."""
+    if since_dt.tzinfo is not None:
+        return lambda ts: _at_or_after(ts, since_dt)
+    since_key = since_dt.isoformat()
+
+    def at_or_after(ts: Optional[str]) -> bool:
+        if not ts:
+            return False
+        if ts.endswith("Z") or ts[-6:-5] in ("+", "-"):  # has a UTC offset
+            return _at_or_after(ts, since_dt)
+        return ts >= since_key
+    return at_or_after
 
 
 @router.get("")
@@ -124,18 +243,14 @@ async def get_replies(
     if STORAGE_MODE == "supabase" and DatabaseService:
         try:
             db = DatabaseService.get_instance()
-            rows = db.get_replies(limit=limit)
-            
-            # Apply filters
-            if account:
-                account_lower = account.strip().lower()
-                rows = [r for r in rows if (r.get("account_username") or "").strip().lower() == account_lower]
+            since_iso = None
             if since:
                 try:
-                    since_dt = datetime.fromisoformat(since.replace("Z", "+00:00"))
-                    rows = [r for r in rows if r.get("timestamp") and datetime.fromisoformat(r["timestamp"].replace("Z", "+00:00")) >= since_dt]
+                    since_iso = datetime.fromisoformat(since.replace("Z", "+00:00")).isoformat()
                 except ValueError:
                     pass
+            # Filters go into the query so the limit applies to matching rows
+            rows = db.get_replies(limit=limit, account=(account or "").strip() or None, since=since_iso)
             
             return {"replies": rows, "total": len(rows)}
         except Exception as e:
@@ -143,19 +258,20 @@ async def get_replies(
             # Fall through to CSV
     
     # Fallback to CSV
-    rows = _parse_replies_csv()
+    filters = []
     if account:
         account_lower = account.strip().lower()
-        rows = [r for r in rows if (r.get("account_username") or "").strip().lower() == account_lower]
+        filters.append(lambda r: (r[_ACCOUNT] or "").strip().lower() == account_lower)
     if campaign_id:
         cid = (campaign_id or "").strip()
         if cid:
-            rows = [r for r in rows if (r.get("campaign_id") or "").strip() == cid]
+            filters.append(lambda r: (r[_CAMPAIGN] or "").strip() == cid)
     if since:
         try:
-            since_dt = datetime.fromisoformat(since.replace("Z", "+00:00"))
-            rows = [r for r in rows if r.get("timestamp") and datetime.fromisoformat(r["timestamp"].replace("Z", "+00:00")) >= since_dt]
+            since_ok = _since_predicate(datetime.fromisoformat(since.replace("Z", "+00:00")))
+            filters.append(lambda r: since_ok(r[_TS]))
         except ValueError:
             pass
-    rows = rows[:limit]
+    match = (lambda r: all(f(r) for f in filters)) if filters else None
+    rows = _recent_replies_csv(limit, match)
     return {"replies": rows, "total": len(rows)}
@@ -1,23 +1,37 @@
-import json
 import os
 from fastapi import APIRouter
 
+from .. import jsonio
+
 router = APIRouter()
 
 SETTINGS_FILE = os.path.join(os.path.dirname(__file__), "..", "settings.json")
 
+# Parsed SETTINGS_FILE keyed by its st_mtime_ns
+_settings_cache = {"mtime": -1, "data": None}
+
 @router.get("")
 async def get_settings():
     """Get global settings"""
     try:
-        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+        mtime_ns = os.stat(SETTINGS_FILE).st_mtime_ns
+        if _settings_cache["mtime"] != mtime_ns:
+            with open(SETTINGS_FILE, "rb") as f:
+                _settings_cache["data"] = jsonio.loads(f.read())
+            _settings_cache["mtime"] = mtime_ns
+        return _settings_cache["data"]
     except Exception:
         return {}
 
 @router.post("")
 async def save_settings(settings: dict):
     """Save global settings"""
-    with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-        json.dump(settings, f, indent=2)
+    # Write to a temp file and swap it in so a crash mid-write cannot corrupt the settings
+    tmp = SETTINGS_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(jsonio.dumps(settings, indent=True))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, SETTINGS_FILE)
+    _settings_cache["mtime"], _settings_cache["data"] = os.stat(SETTINGS_FILE).st_mtime_ns, settings
     return {"message": "Settings saved"}
\ No newline at end of file
@@ -4,12 +4,14 @@ import csv
 import json
 import sys
 import uuid
-import threading
 import asyncio
 import os
+from collections import Counter, deque
+from dataclasses import dataclass
 from datetime import datetime
+from functools import partial
 
-from ..config import CAMPAIGNS_FILE, ACCOUNTS_FILE, KEY_FILE, STORAGE_MODE, SENDS_CSV
+from ..config import KEY_FILE, STORAGE_MODE, SENDS_CSV
 
 # #region agent log
 def _agent_log(location: str, message: str, data: dict, hypothesis_id: str = ""):
@@ -21,6 +23,10 @@ def _agent_log(location: str, message: str, data: dict, hypothesis_id: str = "")
         pass
 # #endregion
 from ..worker_manager import WorkerManager
+from ..clock import now_iso
+from ..encryption import decrypt_field
+from .accounts import flush_accounts, load_accounts
+from .campaigns import load_campaigns, update_campaigns
 
 # Conditional import for DatabaseService
 DatabaseService = None
@@ -33,10 +39,14 @@ from ..instagram_worker import InstagramWorkerThread
 
 router = APIRouter()
 
-# Lock for appending to sends.csv from multiple workers
-_sends_csv_lock = threading.Lock()
-# Lock for updating campaign messages_sent (multiple workers may send for same campaign)
-_campaign_messages_sent_lock = threading.Lock()
+# Sends queued by worker threads and written out by main's periodic flush (the only writer).
+# deque append/popleft are atomic, so worker threads never take a lock to record a send.
+# Rows for sends.csv:
+_pending_send_rows = deque()
+# One campaign_id per sent message, summed into messages_sent at flush time:
+_pending_messages_sent = deque()
+# JSON mode (campaign_id, status, updated_at) changes from start/stop/complete, applied in order:
+_pending_campaign_status = deque()
 
 SENDS_CSV_HEADER = (
     "timestamp",
@@ -51,6 +61,265 @@ SENDS_CSV_HEADER = (
     "message_preview",
 )
 
+ENCRYPTED_ACCOUNT_FIELDS = ("password", "proxy", "session_cookies")
+
+
+def _drain(pending: deque) -> list:
+    """Pop everything currently queued in pending (safe while worker threads keep appending)"""
+    items = []
+    try:
+        while True:
+            items.append(pending.popleft())
+    except IndexError:
+        return items
+
+
+def _append_sends_csv(rows):
+    file_exists = os.path.isfile(SENDS_CSV)
+    with open(SENDS_CSV, "a", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
+        if not file_exists:
+            w.writerow(SENDS_CSV_HEADER)
+        w.writerows(rows)
+
+
+async def flush_sends_csv():
+    """Append the send rows queued by workers since the last flush to sends.csv in one write"""
+    rows = _drain(_pending_send_rows)
+    if not rows:
+        return
+    try:
+        await asyncio.to_thread(_append_sends_csv, rows)
+    except Exception:
+        _pending_send_rows.extendleft(reversed(rows))
+        raise
+
+
+def _add_messages_sent_supabase(counts: Dict[str, int]):
+    db = DatabaseService.get_instance()
+    for campaign_id, n in counts.items():
+        campaign_data = db.get_campaign(campaign_id)
+        if campaign_data is not None:
+            db.update_campaign(campaign_id, {"messages_sent": (campaign_data.get("messages_sent") or 0) + n})
+
+
+def _queue_campaign_status(campaign_id: str, status: str):
+    """Record a JSON-mode campaign status change for the next flush (safe from any thread)"""
+    _pending_campaign_status.append((campaign_id, status, datetime.now().isoformat()))
+
+
+async def flush_campaign_updates():
+    """Apply the messages_sent counts and status changes queued since the last flush (one campaigns write per flush)"""
+    counts = Counter(_drain(_pending_messages_sent))
+    statuses = _drain(_pending_campaign_status)
+    if not counts and not statuses:
+        return
+    try:
+        if STORAGE_MODE == "supabase":
+            if counts:
+                await asyncio.to_thread(_add_messages_sent_supabase, counts)
+        else:
+            def apply_updates(campaigns: dict) -> bool:
+                changed = False
+                now = datetime.now().isoformat()
+                for campaign_id, n in counts.items():
+                    if campaign_id in campaigns:
+                        campaigns[campaign_id]["messages_sent"] = campaigns[campaign_id].get("messages_sent", 0) + n
+                        campaigns[campaign_id]["updated_at"] = now
+                        changed = True
+                for campaign_id, status, updated_at in statuses:
+                    if campaign_id in campaigns:
+                        campaigns[campaign_id]["status"] = status
+                        campaigns[campaign_id]["updated_at"] = updated_at
+                        changed = True
+                return changed
+            await update_campaigns(apply_updates, indent=False)
+    except Exception:
+        # Put everything back so the next flush retries it
+        _pending_messages_sent.extend(counts.elements())
+        _pending_campaign_status.extendleft(reversed(statuses))
+        raise
+
+
+@dataclass
+class WorkerCtx:
+    """What a running worker's callbacks need; they are called from the worker thread."""
+    worker_id: str
+    worker_info: dict
+    campaign_id: str
+    main_loop: asyncio.AbstractEventLoop
+    event_queue: asyncio.Queue
+    # The connection manager's live list (mutated in place), read to skip broadcasts nobody receives
+    connections: list
+
+
+def _broadcast(ctx: WorkerCtx, message_dict: dict):
+    """Queue a broadcast on the main event loop (safe to call from worker thread)."""
+    if not ctx.connections:
+        return  # no dashboard open: skip the hop to the loop
+    try:
+        ctx.main_loop.call_soon_threadsafe(ctx.event_queue.put_nowait, message_dict)
+    except Exception:
+        pass  # Don't fail worker if broadcast drops (e.g. loop closed)
+
+
+def _log_terminal(ctx: WorkerCtx, msg: str, is_error: bool = False):
+    """Print worker update to terminal; safe for Windows console (cp1252)."""
+    stream = sys.stderr if is_error else sys.stdout
+    prefix = f"[{ctx.worker_info.get('account_name', 'worker')}]"
+    out = f"{prefix} {msg}"
+    enc = getattr(stream, "encoding", None) or "utf-8"
+    try:
+        stream.buffer.write((out + "\n").encode(enc, errors="replace"))
+        stream.buffer.flush()
+    except (AttributeError, OSError):
+        stream.write(out.encode(enc, errors="replace").decode(enc) + "\n")
+        stream.flush()
+
+
+def _on_update(ctx: WorkerCtx, message: str):
+    ctx.worker_info["last_update"] = message
+    _log_terminal(ctx, message)
+    _broadcast(ctx, {
+        "type": "log",
+        "worker_id": ctx.worker_id,
+        "message": message,
+        "timestamp": now_iso(),
+        "source": "instagrapi",
+    })
+
+
+def _on_progress(ctx: WorkerCtx, progress: int):
+    ctx.worker_info["progress"] = progress
+    _log_terminal(ctx, f"Progress: {progress}%")
+    _broadcast(ctx, {
+        "type": "progress",
+        "worker_id": ctx.worker_id,
+        "progress": progress,
+        "timestamp": now_iso(),
+        "source": "instagrapi",
+    })
+
+
+def _on_error(ctx: WorkerCtx, error: str):
+    ctx.worker_info["errors"] += 1
+    ctx.worker_info["status"] = "error"
+    _log_terminal(ctx, f"ERROR: {error}", is_error=True)
+    _broadcast(ctx, {
+        "type": "error",
+        "worker_id": ctx.worker_id,
+        "error": error,
+        "timestamp": now_iso(),
+        "source": "instagrapi",
+    })
+
+
+def _on_complete(ctx: WorkerCtx, success: bool = True):
+    # #region agent log
+    _agent_log("workers.py:on_complete", "entry", {"success": success}, "H4")
+    # #endregion
+    worker_info = ctx.worker_info
+    sent = worker_info.get("messages_sent", 0)
+    if success:
+        worker_info["status"] = "completed"
+        _log_terminal(ctx, f"Completed. Sent {sent} messages.")
+        campaign_status = "draft"
+        complete_message = f"Completed. Sent {sent} messages."
+    else:
+        worker_info["status"] = "error"
+        _log_terminal(ctx, "Finished with error (e.g. login required).", is_error=True)
+        campaign_status = "failed"
+        complete_message = "Finished with error (e.g. session expired / login required)."
+    try:
+        if STORAGE_MODE == "supabase":
+            db_service = DatabaseService.get_instance()
+            db_service.update_campaign(ctx.campaign_id, {"status": campaign_status})
+        else:
+            _queue_campaign_status(ctx.campaign_id, campaign_status)
+    except Exception as e:
+        print(f"Error updating campaign status: {e}")
+    _broadcast(ctx, {
+        "type": "complete",
+        "worker_id": ctx.worker_id,
+        "message": complete_message,
+        "success": success,
+        "timestamp": now_iso(),
+        "source": "instagrapi",
+    })
+    WorkerManager.get_instance().remove_worker(ctx.worker_id)
+
+
+def _on_message_sent(ctx: WorkerCtx, recipient_username: str, recipient_user_id: int, message_text: str):
+    # One clock read for the broadcast and the sends.csv row
+    sent_at = datetime.now().isoformat()
+    worker_info = ctx.worker_info
+    worker_info["messages_sent"] += 1
+    n = worker_info["messages_sent"]
+    _log_terminal(ctx, f"Message #{n} sent")
+    _broadcast(ctx, {
+        "type": "message_sent",
+        "worker_id": ctx.worker_id,
+        "messages_sent": n,
+        "timestamp": sent_at,
+        "source": "instagrapi",
+    })
+    # Append to send-tracking (Supabase or CSV)
+    message_preview = (message_text or "")[:500]
+    
+    if STORAGE_MODE == "supabase" and DatabaseService:
+        # Write to Supabase
+        try:
+            db_service = DatabaseService.get_instance()
+            db_service.record_send(
+                account_username=worker_info.get("username", ""),
+                recipient_username=recipient_username or "",
+                account_name=worker_info.get("account_name", ""),
+                campaign_id=worker_info.get("campaign_id", ""),
+                campaign_name=worker_info.get("campaign_name", ""),
+                lead_source=worker_info.get("lead_source", ""),
+                lead_target=worker_info.get("target_input", ""),
+                recipient_user_id=str(recipient_user_id) if recipient_user_id else None,
+                message_preview=message_preview,
+            )
+        except Exception as e:
+            _log_terminal(ctx, f"Failed to write to Supabase sends: {e}", is_error=True)
+    
+    # Also write to CSV as backup
+    row = (
+        sent_at,
+        worker_info.get("username", ""),
+        worker_info.get("account_name", ""),
+        worker_info.get("campaign_id", ""),
+        worker_info.get("campaign_name", ""),
+        worker_info.get("lead_source", ""),
+        worker_info.get("target_input", ""),
+        recipient_username or "",
+        recipient_user_id,
+        message_preview,
+    )
+    _pending_send_rows.append(row)
+    # Count towards the campaign's messages_sent; flush_campaign_updates writes it out shortly
+    _pending_messages_sent.append(ctx.campaign_id)
+
+
+def _on_request_challenge_code(ctx: WorkerCtx, username_arg, choice):
+    """Called by worker thread when Instagram requires 2FA/challenge code. Blocks until code is submitted."""
+    choice_str = getattr(choice, "name", str(choice))
+    _log_terminal(ctx, f"2FA/challenge required for @{username_arg} ({choice_str}). Waiting for code...")
+    pending = WorkerManager.get_instance().get_or_create_pending_challenge(ctx.worker_id)
+    _broadcast(ctx, {
+        "type": "need_2fa",
+        "worker_id": ctx.worker_id,
+        "username": username_arg,
+        "choice": choice_str,
+        "timestamp": now_iso(),
+        "source": "instagrapi",
+    })
+    pending["event"].wait(timeout=300)
+    code = pending.get("code")
+    WorkerManager.get_instance().clear_pending_challenge(ctx.worker_id)
+    return code or False
+
 
 @router.post("/start")
 async def start_worker(worker_data: dict, background_tasks: BackgroundTasks):
@@ -73,7 +342,7 @@ async def start_worker(worker_data: dict, background_tasks: BackgroundTasks):
                 raise HTTPException(status_code=500, detail=f"Database service unavailable: {e}")
             
             # Get account
-            account = db_service.get_account(username)
+            account = await asyncio.to_thread(db_service.get_account, username)
             if not account:
                 raise HTTPException(status_code=404, detail="Account not found")
             
@@ -83,23 +352,16 @@ async def start_worker(worker_data: dict, background_tasks: BackgroundTasks):
             account_name = account.get("account_name", username)
             
             # Get campaign
-            campaign = db_service.get_campaign(campaign_id)
+            campaign = await asyncio.to_thread(db_service.get_campaign, campaign_id)
             if not campaign:
                 raise HTTPException(status_code=404, detail="Campaign not found")
             
             # Update campaign status to "running"
-            db_service.update_campaign(campaign_id, {"status": "running"})
+            await asyncio.to_thread(db_service.update_campaign, campaign_id, {"status": "running"})
         else:
-            # Legacy JSON implementation
-            import base64
-            from cryptography.fernet import Fernet
-            import os
-            
-            try:
-                with open(ACCOUNTS_FILE, "r", encoding='utf-8') as f:
-                    accounts = json.load(f)
-            except:
-                raise HTTPException(status_code=404, detail="Accounts file not found")
+            # Legacy JSON implementation (write out account changes still held in memory first)
+            await flush_accounts()
+            accounts = await asyncio.to_thread(load_accounts)
             
             if username not in accounts:
                 raise HTTPException(status_code=404, detail="Account not found")
@@ -108,53 +370,29 @@ async def start_worker(worker_data: dict, background_tasks: BackgroundTasks):
             if not os.path.exists(KEY_FILE):
                 raise HTTPException(status_code=500, detail="Encryption key not found")
             
-            with open(KEY_FILE, "rb") as f:
-                key = f.read()
-            
-            fernet = Fernet(key)
-            
-            password = None
-            if 'password' in accounts[username] and accounts[username]['password']:
-                encrypted_password = base64.b64decode(accounts[username]['password'])
-                password = fernet.decrypt(encrypted_password).decode()
-            
-            proxy = None
-            if 'proxy' in accounts[username] and accounts[username]['proxy']:
-                encrypted_proxy = base64.b64decode(accounts[username]['proxy'])
-                proxy = fernet.decrypt(encrypted_proxy).decode()
-            
-            session_cookies = None
-            if 'session_cookies' in accounts[username] and accounts[username]['session_cookies']:
-                encrypted_cookies = base64.b64decode(accounts[username]['session_cookies'])
-                session_cookies = fernet.decrypt(encrypted_cookies).decode()
-            
-            account_name = accounts[username].get("account_name", username)
+            # The cipher is built once per process by the encryption module; decrypt all fields in one pass
+            account = accounts[username]
+            password, proxy, session_cookies = (
+                decrypt_field(account[field]) if account.get(field) else None
+                for field in ENCRYPTED_ACCOUNT_FIELDS
+            )
             
-            # Load campaign
-            try:
-                with open(CAMPAIGNS_FILE, "r", encoding='utf-8') as f:
-                    campaigns = json.load(f)
-            except:
-                raise HTTPException(status_code=404, detail="Campaigns file not found")
+            account_name = account.get("account_name", username)
             
-            if campaign_id not in campaigns:
+            # Load campaign (mtime-cached, read-only) and queue its status change to "running"
+            campaign = (await asyncio.to_thread(load_campaigns)).get(campaign_id)
+            if campaign is None:
                 raise HTTPException(status_code=404, detail="Campaign not found")
-            
-            campaign = campaigns[campaign_id]
-            
-            # Update campaign status to "running"
-            campaigns[campaign_id]["status"] = "running"
-            campaigns[campaign_id]["updated_at"] = datetime.now().isoformat()
-            with open(CAMPAIGNS_FILE, "w", encoding='utf-8') as f:
-                json.dump(campaigns, f, indent=2)
+            _queue_campaign_status(campaign_id, "running")
         
         # Generate worker ID
         worker_id = str(uuid.uuid4())
         
         # Parse bio keywords
-        bio_keywords = []
+        # Normalized once here; the worker matches them against each lead's lowercased bio
+        bio_keywords = frozenset()
         if campaign.get("bio_filter_enabled") and campaign.get("bio_keywords"):
-            bio_keywords = [k.strip() for k in campaign["bio_keywords"].split(",") if k.strip()]
+            bio_keywords = frozenset(k for k in (k.strip().lower() for k in campaign["bio_keywords"].split(",")) if k)
         
         # Create worker data (include lead source for sends.csv)
         target_mode = campaign.get("target_mode", 0)
@@ -177,201 +415,18 @@ async def start_worker(worker_data: dict, background_tasks: BackgroundTasks):
             "progress": 0
         }
         
-        # Create callback functions for WebSocket updates
+        # Callbacks are module-level functions bound to this worker's context
         from ..main import app
-        connection_manager = app.state.connection_manager
-        # Capture the event loop so worker thread can schedule broadcasts thread-safely
-        main_loop = asyncio.get_running_loop()
-        
-        def create_broadcast_task(message_dict):
-            """Schedule broadcast on the main event loop (safe to call from worker thread)."""
-            try:
-                asyncio.run_coroutine_threadsafe(
-                    connection_manager.broadcast(message_dict),
-                    main_loop,
-                )
-            except Exception:
-                pass  # Don't fail worker if broadcast drops
-        
-        def log_terminal(msg: str, is_error: bool = False):
-            """Print worker update to terminal; safe for Windows console (cp1252)."""
-            stream = sys.stderr if is_error else sys.stdout
-            prefix = f"[{worker_info.get('account_name', 'worker')}]"
-            out = f"{prefix} {msg}"
-            enc = getattr(stream, "encoding", None) or "utf-8"
-            try:
-                stream.buffer.write((out + "\n").encode(enc, errors="replace"))
-                stream.buffer.flush()
-            except (AttributeError, OSError):
-                stream.write(out.encode(enc, errors="replace").decode(enc) + "\n")
-                stream.flush()
-        
-        def on_update(message: str):
-            worker_info["last_update"] = message
-            log_terminal(message)
-            create_broadcast_task({
-                "type": "log",
-                "worker_id": worker_id,
-                "message": message,
-                "timestamp": datetime.now().isoformat(),
-                "source": "instagrapi",
-            })
-        
-        def on_progress(progress: int):
-            worker_info["progress"] = progress
-            log_terminal(f"Progress: {progress}%")
-            create_broadcast_task({
-                "type": "progress",
-                "worker_id": worker_id,
-                "progress": progress,
-                "timestamp": datetime.now().isoformat(),
-                "source": "instagrapi",
-            })
-        
-        def on_error(error: str):
-            worker_info["errors"] += 1
-            worker_info["status"] = "error"
-            log_terminal(f"ERROR: {error}", is_error=True)
-            create_broadcast_task({
-                "type": "error",
-                "worker_id": worker_id,
-                "error": error,
-                "timestamp": datetime.now().isoformat(),
-                "source": "instagrapi",
-            })
-        
-        def on_complete(success: bool = True):
-            # #region agent log
-            _agent_log("workers.py:on_complete", "entry", {"success": success}, "H4")
-            # #endregion
-            sent = worker_info.get("messages_sent", 0)
-            if success:
-                worker_info["status"] = "completed"
-                log_terminal(f"Completed. Sent {sent} messages.")
-                campaign_status = "draft"
-                complete_message = f"Completed. Sent {sent} messages."
-            else:
-                worker_info["status"] = "error"
-                log_terminal("Finished with error (e.g. login required).", is_error=True)
-                campaign_status = "failed"
-                complete_message = "Finished with error (e.g. session expired / login required)."
-            try:
-                if STORAGE_MODE == "supabase":
-                    db_service = DatabaseService.get_instance()
-                    db_service.update_campaign(campaign_id, {"status": campaign_status})
-                else:
-                    with open(CAMPAIGNS_FILE, "r", encoding='utf-8') as f:
-                        campaigns = json.load(f)
-                    if campaign_id in campaigns:
-                        campaigns[campaign_id]["status"] = campaign_status
-                        campaigns[campaign_id]["updated_at"] = datetime.now().isoformat()
-                        with open(CAMPAIGNS_FILE, "w", encoding='utf-8') as f:
-                            json.dump(campaigns, f, indent=2)
-            except Exception as e:
-                print(f"Error updating campaign status: {e}")
-            create_broadcast_task({
-                "type": "complete",
-                "worker_id": worker_id,
-                "message": complete_message,
-                "success": success,
-                "timestamp": datetime.now().isoformat(),
-                "source": "instagrapi",
-            })
-            WorkerManager.get_instance().remove_worker(worker_id)
-        
-        def on_message_sent(recipient_username: str, recipient_user_id: int, message_text: str):
-            worker_info["messages_sent"] += 1
-            n = worker_info["messages_sent"]
-            log_terminal(f"Message #{n} sent")
-            create_broadcast_task({
-                "type": "message_sent",
-                "worker_id": worker_id,
-                "messages_sent": worker_info["messages_sent"],
-                "timestamp": datetime.now().isoformat(),
-                "source": "instagrapi",
-            })
-            # Append to send-tracking (Supabase or CSV)
-            message_preview = (message_text or "")[:500]
-            
-            if STORAGE_MODE == "supabase" and DatabaseService:
-                # Write to Supabase
-                try:
-                    db_service = DatabaseService.get_instance()
-                    db_service.record_send(
-                        account_username=worker_info.get("username", ""),
-                        recipient_username=recipient_username or "",
-                        account_name=worker_info.get("account_name", ""),
-                        campaign_id=worker_info.get("campaign_id", ""),
-                        campaign_name=worker_info.get("campaign_name", ""),
-                        lead_source=worker_info.get("lead_source", ""),
-                        lead_target=worker_info.get("target_input", ""),
-                        recipient_user_id=str(recipient_user_id) if recipient_user_id else None,
-                        message_preview=message_preview,
-                    )
-                except Exception as e:
-                    log_terminal(f"Failed to write to Supabase sends: {e}", is_error=True)
-            
-            # Also write to CSV as backup
-            row = (
-                datetime.now().isoformat(),
-                worker_info.get("username", ""),
-                worker_info.get("account_name", ""),
-                worker_info.get("campaign_id", ""),
-                worker_info.get("campaign_name", ""),
-                worker_info.get("lead_source", ""),
-                worker_info.get("target_input", ""),
-                recipient_username or "",
-                recipient_user_id,
-                message_preview,
-            )
-            with _sends_csv_lock:
-                try:
-                    file_exists = os.path.isfile(SENDS_CSV)
-                    with open(SENDS_CSV, "a", newline="", encoding="utf-8") as f:
-                        w = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
-                        if not file_exists:
-                            w.writerow(SENDS_CSV_HEADER)
-                        w.writerow(row)
-                except Exception as e:
-                    log_terminal(f"Failed to write sends.csv: {e}", is_error=True)
-            # Update campaign messages_sent so dashboard shows live progress
-            with _campaign_messages_sent_lock:
-                try:
-                    if STORAGE_MODE == "supabase":
-                        db = DatabaseService.get_instance()
-                        campaign_data = db.get_campaign(campaign_id)
-                        if campaign_data is not None:
-                            new_sent = (campaign_data.get("messages_sent") or 0) + 1
-                            db.update_campaign(campaign_id, {"messages_sent": new_sent})
-                    else:
-                        if os.path.exists(CAMPAIGNS_FILE):
-                            with open(CAMPAIGNS_FILE, "r", encoding="utf-8") as f:
-                                campaigns = json.load(f)
-                            if campaign_id in campaigns:
-                                campaigns[campaign_id]["messages_sent"] = campaigns[campaign_id].get("messages_sent", 0) + 1
-                                campaigns[campaign_id]["updated_at"] = datetime.now().isoformat()
-                                with open(CAMPAIGNS_FILE, "w", encoding="utf-8") as f:
-                                    json.dump(campaigns, f, indent=2)
-                except Exception as e:
-                    log_terminal(f"Failed to update campaign messages_sent: {e}", is_error=True)
-        
-        def on_request_challenge_code(username_arg, choice):
-            """Called by worker thread when Instagram requires 2FA/challenge code. Blocks until code is submitted."""
-            choice_str = getattr(choice, "name", str(choice))
-            log_terminal(f"2FA/challenge required for @{username_arg} ({choice_str}). Waiting for code...")
-            pending = WorkerManager.get_instance().get_or_create_pending_challenge(worker_id)
-            create_broadcast_task({
-                "type": "need_2fa",
-                "worker_id": worker_id,
-                "username": username_arg,
-                "choice": choice_str,
-                "timestamp": datetime.now().isoformat(),
-                "source": "instagrapi",
-            })
-            pending["event"].wait(timeout=300)
-            code = pending.get("code")
-            WorkerManager.get_instance().clear_pending_challenge(worker_id)
-            return code or False
+        ctx = WorkerCtx(
+            worker_id=worker_id,
+            worker_info=worker_info,
+            campaign_id=campaign_id,
+            # Capture the event loop so the worker thread can queue broadcasts thread-safely
+            main_loop=asyncio.get_running_loop(),
+            # Worker events go to the queue drained by main's broadcaster task
+            event_queue=app.state.worker_event_queue,
+            connections=app.state.connection_manager.active_connections,
+        )
         
         # Create and start worker thread
         worker_thread = InstagramWorkerThread(
@@ -402,12 +457,12 @@ async def start_worker(worker_data: dict, background_tasks: BackgroundTasks):
             enable_rotation=worker_data.get("enable_rotation", True),
             enable_sessions=worker_data.get("enable_sessions", True),
             human_behavior=worker_data.get("human_behavior", True),
-            on_update=on_update,
-            on_progress=on_progress,
-            on_error=on_error,
-            on_complete=on_complete,
-            on_message_sent=on_message_sent,
-            on_request_challenge_code=on_request_challenge_code,
+            on_update=partial(_on_update, ctx),
+            on_progress=partial(_on_progress, ctx),
+            on_error=partial(_on_error, ctx),
+            on_complete=partial(_on_complete, ctx),
+            on_message_sent=partial(_on_message_sent, ctx),
+            on_request_challenge_code=partial(_on_request_challenge_code, ctx),
         )
         
         # Add to worker manager
@@ -477,26 +532,19 @@ async def stop_worker(worker_id: str):
             try:
                 if STORAGE_MODE == "supabase":
                     db_service = DatabaseService.get_instance()
-                    db_service.update_campaign(campaign_id, {"status": "draft"})
+                    await asyncio.to_thread(db_service.update_campaign, campaign_id, {"status": "draft"})
                 else:
-                    with open(CAMPAIGNS_FILE, "r", encoding='utf-8') as f:
-                        campaigns = json.load(f)
-                    if campaign_id in campaigns:
-                        campaigns[campaign_id]["status"] = "draft"
-                        campaigns[campaign_id]["updated_at"] = datetime.now().isoformat()
-                        with open(CAMPAIGNS_FILE, "w", encoding='utf-8') as f:
-                            json.dump(campaigns, f, indent=2)
+                    _queue_campaign_status(campaign_id, "draft")
             except Exception as e:
                 print(f"Error updating campaign status: {e}")
         
         from ..main import app
         connection_manager = app.state.connection_manager
-        import asyncio
-        asyncio.run(connection_manager.broadcast({
+        await connection_manager.broadcast({
             "type": "stopped",
             "worker_id": worker_id,
             "timestamp": datetime.now().isoformat()
-        }))
+        })
     
     return {"message": "Worker stopped successfully"}
 
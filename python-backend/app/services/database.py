@@ -8,12 +8,11 @@ except ImportError:
     SUPABASE_AVAILABLE = False
     create_client = None
     Client = None
-from cryptography.fernet import Fernet
-import base64
 import json
 from datetime import datetime
 
-from ..config import KEY_FILE, STORAGE_MODE
+from ..config import STORAGE_MODE
+from ..encryption import encrypt_field, decrypt_field
 
 class DatabaseService:
     """Service layer for Supabase database operations with multi-tenant support"""
@@ -58,35 +57,18 @@ class DatabaseService:
         """Get the current user_id"""
         return self._user_id
     
-    def get_encryption_key(self) -> bytes:
-        """Get or create encryption key"""
-        if os.path.exists(KEY_FILE):
-            with open(KEY_FILE, "rb") as f:
-                return f.read()
-        else:
-            key = Fernet.generate_key()
-            with open(KEY_FILE, "wb") as f:
-                f.write(key)
-            return key
-    
     def encrypt(self, data: str) -> str:
         """Encrypt sensitive data"""
         if not data:
             return None
-        key = self.get_encryption_key()
-        fernet = Fernet(key)
-        encrypted = fernet.encrypt(data.encode())
-        return base64.b64encode(encrypted).decode()
+        return encrypt_field(data)
     
     def decrypt(self, encrypted_data: str) -> Optional[str]:
         """Decrypt sensitive data"""
         if not encrypted_data:
             return None
         try:
-            key = self.get_encryption_key()
-            fernet = Fernet(key)
-            encrypted = base64.b64decode(encrypted_data)
-            return fernet.decrypt(encrypted).decode()
+            return decrypt_field(encrypted_data)
         except Exception:
             return None
     
@@ -144,6 +126,37 @@ class DatabaseService:
             print(f"Error getting account {username}: {e}")
             return None
     
+    def get_accounts_with_credentials(self, user_id: Optional[str] = None) -> List[Dict]:
+        """Get all accounts with decrypted sensitive data in a single query"""
+        try:
+            query = self.client.table("accounts").select("id, username, account_name, created_at, password, proxy, session_cookies")
+            uid = user_id or self._user_id
+            if uid:
+                query = query.eq("user_id", uid)
+            response = query.execute()
+            result = []
+            for account in (response.data or []):
+                if not account.get("username"):
+                    continue
+                row = {
+                    "id": account.get("id"),
+                    "username": account["username"],
+                    "account_name": account.get("account_name", account["username"]),
+                    "created_at": account.get("created_at")
+                }
+                # Decrypt sensitive fields
+                if account.get("password"):
+                    row["password"] = self.decrypt(account["password"])
+                if account.get("proxy"):
+                    row["proxy"] = self.decrypt(account["proxy"])
+                if account.get("session_cookies"):
+                    row["session_cookies"] = self.decrypt(account["session_cookies"])
+                result.append(row)
+            return result
+        except Exception as e:
+            print(f"Error getting accounts with credentials: {e}")
+            return []
+    
     def create_account(self, username: str, account_name: str, password: Optional[str] = None,
                        proxy: Optional[str] = None, session_cookies: Optional[str] = None,
                        user_id: Optional[str] = None) -> Dict:
@@ -403,13 +416,20 @@ class DatabaseService:
             print(f"Error recording reply: {e}")
             return None
     
-    def get_replies(self, limit: int = 500, user_id: Optional[str] = None) -> List[Dict]:
-        """Get recent replies"""
+    def get_replies(self, limit: int = 500, user_id: Optional[str] = None,
+                    account: Optional[str] = None, since: Optional[str] = None) -> List[Dict]:
+        """Get recent replies, optionally only for account (case-insensitive) and at or after since (ISO)"""
         try:
             query = self.client.table("replies").select("*").order("timestamp", desc=True).limit(limit)
             uid = user_id or self._user_id
             if uid:
                 query = query.eq("user_id", uid)
+            # Filter server-side so limit counts matching rows only
+            if account:
+                pattern = account.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                query = query.ilike("account_username", pattern)
+            if since:
+                query = query.gte("timestamp", since)
             response = query.execute()
             return response.data or []
         except Exception as e:
@@ -10,6 +10,7 @@ class WorkerManager:
         self.active_workers: Dict[str, dict] = {}
         self.worker_threads: Dict[str, any] = {}
         self.pending_challenges: Dict[str, dict] = {}  # worker_id -> {"event": Event(), "code": None}
+        self.campaign_worker_counts: Dict[str, int] = {}  # campaign_id -> number of live workers
         self.lock = threading.Lock()
     
     @classmethod
@@ -22,12 +23,21 @@ class WorkerManager:
     
     def add_worker(self, worker_id: str, worker_data: dict, thread):
         with self.lock:
+            if worker_id not in self.active_workers:
+                campaign_id = worker_data.get("campaign_id")
+                if campaign_id:
+                    self.campaign_worker_counts[campaign_id] = self.campaign_worker_counts.get(campaign_id, 0) + 1
             self.active_workers[worker_id] = worker_data
             self.worker_threads[worker_id] = thread
     
     def remove_worker(self, worker_id: str):
         with self.lock:
             if worker_id in self.active_workers:
+                campaign_id = self.active_workers[worker_id].get("campaign_id")
+                if campaign_id in self.campaign_worker_counts:
+                    self.campaign_worker_counts[campaign_id] -= 1
+                    if self.campaign_worker_counts[campaign_id] <= 0:
+                        del self.campaign_worker_counts[campaign_id]
                 del self.active_workers[worker_id]
             if worker_id in self.worker_threads:
                 del self.worker_threads[worker_id]
@@ -55,6 +65,11 @@ class WorkerManager:
             if worker_id in self.pending_challenges:
                 del self.pending_challenges[worker_id]
     
+    @property
+    def active_campaign_count(self) -> int:
+        """Number of campaigns with at least one live worker (kept up to date by add/remove_worker)."""
+        return len(self.campaign_worker_counts)
+    
     def get_worker(self, worker_id: str) -> Optional[dict]:
         with self.lock:
             return self.active_workers.get(worker_id)
@@ -12,6 +12,13 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 def main():
     import uvicorn
+    # Faster event loop where available (uvloop has no Windows build)
+    try:
+        import uvloop
+        uvloop.install()
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
     from app.main import app
     
     print("[GramSender] Starting backend server...")
@@ -23,7 +30,8 @@ def main():
         app,
         host="127.0.0.1",
         port=8012,
-        log_level="info"
+        log_level="info",
+        loop=loop,
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("instagrapi")
+
+from app import instagram_worker, reply_monitor
+
+
+@pytest.fixture
+def sent_dms_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "sent_dms.json")
+    monkeypatch.setattr(instagram_worker, "SENT_DMS_FILE", path)
+    monkeypatch.setattr(reply_monitor, "SENT_DMS_FILE", path)
+    monkeypatch.setattr(reply_monitor, "_sent_dms_index", None)
+    monkeypatch.setattr(reply_monitor, "_sent_dms_last_send", {})
+    return path
+
+
+def test_account_without_thread_id_is_polled(sent_dms_file):
+    # direct_send_text (like manual_api and httpcloak) reports no thread id
+    instagram_worker._append_sent_dm("c1", "sender", "lead", None, datetime.now().isoformat(), "hi")
+
+    assert reply_monitor._recently_active_accounts(7) == {"sender"}
+    assert reply_monitor._find_campaign_for_recipient("lead") == "c1"
+
+
+def test_old_sends_are_not_polled(sent_dms_file):
+    instagram_worker._append_sent_dm("c1", "sender", "lead", "t1", "2000-01-01T00:00:00", "hi")
+
+    assert reply_monitor._recently_active_accounts(7) == set()